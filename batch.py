@@ -0,0 +1,100 @@
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from roster_io import load_roster, find_rosters
+from shift_scheduler import schedule_shifts_by_day, export_schedule_to_csv
+from multistart import score_schedule
+from shift_history import ShiftHistory
+
+logger = logging.getLogger(__name__)
+
+def _schedule_roster(path, output_dir, engine, csv, pdf, history_dir=None):
+    # Runs in a pool process: loads, schedules and exports one roster, returns its summary
+    start = time.perf_counter()
+    name = Path(path).stem
+    roster = load_roster(path)
+    history = None
+    if history_dir:
+        history = ShiftHistory(os.path.join(history_dir, f"{name}.history"))
+        roster['previous_shifts'] = history.previous_shifts(roster['work_periods'], roster['min_distance'], roster['workers'])
+    loaded = time.perf_counter()
+    schedule = schedule_shifts_by_day(**roster, engine=engine)
+    scheduled = time.perf_counter()
+    if history is not None:
+        history.append(schedule)
+    outputs = []
+    if csv:
+        outputs.append(os.path.join(output_dir, f"{name}.csv"))
+        export_schedule_to_csv(schedule, outputs[-1])
+    if pdf:
+        from pdf_exporter import export_schedule_to_pdf
+        outputs.append(os.path.join(output_dir, f"{name}.pdf"))
+        export_schedule_to_pdf(schedule, outputs[-1], processes=1)
+    score = score_schedule(schedule, roster['workers'], roster['work_periods'], roster['holidays'], roster['jobs'])
+    return {
+        'roster': name,
+        'workers': len(roster['workers']),
+        'shifts': sum(len(shifts) for shifts in schedule.values()),
+        'coverage': score['coverage'],
+        'quota_deviation': score['quota_deviation'],
+        'load_seconds': loaded - start,
+        'schedule_seconds': scheduled - loaded,
+        'export_seconds': time.perf_counter() - scheduled,
+        'outputs': outputs,
+        'error': None,
+    }
+
+def schedule_batch(directory, output_dir=None, engine="greedy", csv=True, pdf=False, max_workers=None, history_dir=None):
+    """Schedules every roster definition in directory (JSON or CSV, see roster_io) in a process pool.
+
+    Each roster is loaded, scheduled and exported in its own pool process, to output_dir
+    (by default a schedules directory next to the rosters) as <roster name>.csv and .pdf.
+    max_workers defaults to one process per CPU. With history_dir, each roster keeps a
+    shift_history.ShiftHistory there that seeds its run and records the result.
+    Returns one summary dict per roster in name order; a roster that fails is reported with
+    its error instead of stopping the batch.
+    """
+    paths = find_rosters(directory)
+    output_dir = output_dir or os.path.join(directory, 'schedules')
+    os.makedirs(output_dir, exist_ok=True)
+    if history_dir:
+        os.makedirs(history_dir, exist_ok=True)
+    max_workers = max_workers or os.cpu_count() or 1
+    logger.info("Scheduling %d rosters from %s with %d processes", len(paths), directory, max_workers)
+
+    if not paths:
+        return []
+    results = {}
+    with ProcessPoolExecutor(max_workers=min(max_workers, len(paths))) as executor:
+        futures = {executor.submit(_schedule_roster, str(path), output_dir, engine, csv, pdf, history_dir): path for path in paths}
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                results[path] = future.result()
+            except Exception as e:
+                logger.error("Roster %s failed: %s", path.name, e)
+                results[path] = {'roster': path.stem, 'error': str(e)}
+            else:
+                logger.info("Roster %s scheduled in %.2fs", path.name, results[path]['schedule_seconds'])
+    return [results[path] for path in paths]
+
+def format_summary(results, wall_seconds=None):
+    # Plain-text table of the schedule_batch results, one line per roster
+    lines = [f"{'Roster':<24} {'Workers':>7} {'Shifts':>7} {'Coverage':>9} {'Deviation':>9} {'Load s':>7} {'Sched s':>8} {'Export s':>8}"]
+    for result in results:
+        if result['error'] is not None:
+            lines.append(f"{result['roster']:<24} failed: {result['error']}")
+            continue
+        lines.append(f"{result['roster']:<24} {result['workers']:>7} {result['shifts']:>7} {result['coverage']:>9.1%} {result['quota_deviation']:>9.2f} "
+                     f"{result['load_seconds']:>7.2f} {result['schedule_seconds']:>8.2f} {result['export_seconds']:>8.2f}")
+    done = [result for result in results if result['error'] is None]
+    failed = len(results) - len(done)
+    total = f"{len(done)} rosters scheduled, {failed} failed"
+    if done:
+        total += f", {sum(result['schedule_seconds'] for result in done):.2f}s scheduling, lowest coverage {min(result['coverage'] for result in done):.1%}"
+    if wall_seconds is not None:
+        total += f", {wall_seconds:.2f}s wall time"
+    lines.append(total)
+    return "\n".join(lines)
@@ -0,0 +1,216 @@
+"""Benchmarks for the scheduler and exporters on synthetic rosters.
+
+Run `python benchmark.py` for the default scaling sweep, or e.g.
+`python benchmark.py --workers 10,100 --days 30 --output bench.json` for a subset. Results
+are written as JSON; `--compare previous.json` reports timings that regressed. Process startup
+of the headless entry point is timed too, see run_startup_benchmarks.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from worker import Worker
+from shift_scheduler import schedule_shifts_by_day, prepare_breakdown, export_schedule_to_csv
+from roster_io import save_roster
+from worker_table import WorkerTable
+
+DEFAULT_WORKERS = [10, 100, 500, 1000, 5000]
+DEFAULT_DAYS = [30, 90, 365, 1095]
+
+def generate_roster(num_workers, num_days, num_jobs=3, seed=0, start=date(2025, 1, 1), columnar=False):
+    """Builds a reproducible synthetic roster as keyword arguments for schedule_shifts.
+
+    The horizon is split into month-long work periods. Workers get mixed percentage_shifts,
+    three groups with occasional group_incompatibility, scattered unavailable dates, some
+    obligatory coverage and, for a quarter of them, their own multi-month working periods.
+    With columnar=True the workers are views of a WorkerTable instead of Worker objects.
+    """
+    rnd = random.Random(seed)
+    fmt = lambda day: day.strftime("%d/%m/%Y")
+    end = start + timedelta(days=num_days - 1)
+
+    work_periods = []
+    period_start = start
+    while period_start <= end:
+        period_end = min(period_start + timedelta(days=29), end)
+        work_periods.append(f"{fmt(period_start)}-{fmt(period_end)}")
+        period_start = period_end + timedelta(days=1)
+
+    holidays = sorted({fmt(start + timedelta(days=rnd.randrange(num_days))) for _ in range(max(1, num_days // 30))})
+    random_day = lambda: start + timedelta(days=rnd.randrange(num_days))
+
+    table = WorkerTable() if columnar else None
+    workers = []
+    for i in range(num_workers):
+        work_dates = []
+        if rnd.random() < 0.25:
+            first = random_day()
+            last = min(first + timedelta(days=rnd.randint(60, 240)), end)
+            work_dates = [f"{fmt(first)}-{fmt(last)}"]
+        unavailable = sorted({fmt(random_day()) for _ in range(rnd.randint(0, max(1, num_days // 20)))})
+        obligatory = [fmt(random_day())] if rnd.random() < 0.1 else []
+        group = str(rnd.randint(1, 3))
+        incompatible_groups = [str(rnd.randint(1, 3))] if rnd.random() < 0.1 else []
+        arguments = (f"W{i + 1}", work_dates, rnd.choice([100, 100, 100, 80, 50]), group, [], incompatible_groups, obligatory, unavailable)
+        workers.append(table.add(*arguments) if columnar else Worker(*arguments))
+
+    return {
+        'work_periods': work_periods,
+        'holidays': holidays,
+        'jobs': [chr(ord('A') + j) for j in range(num_jobs)],
+        'workers': workers,
+        'min_distance': 2,
+        'max_shifts_per_week': 3,
+    }
+
+def _best_time(func, repeat, setup=None):
+    # setup runs untimed before every repetition and its result is passed to func
+    timings = []
+    result = None
+    for _ in range(repeat):
+        args = (setup(),) if setup else ()
+        start = time.perf_counter()
+        result = func(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+def _optional_exporters():
+    exporters = {}
+    try:
+        from pdf_exporter import export_schedule_to_pdf
+        exporters['export_schedule_to_pdf'] = export_schedule_to_pdf
+    except ImportError as e:
+        logging.warning("Skipping PDF export benchmark: %s", e)
+    try:
+        from ical_exporter import export_schedule_to_icalendar
+        exporters['export_schedule_to_icalendar'] = export_schedule_to_icalendar
+    except ImportError as e:
+        logging.warning("Skipping iCalendar export benchmark: %s", e)
+    return exporters
+
+def run_benchmarks(worker_counts, day_counts, num_jobs=3, engines=("greedy",), repeat=3, seed=0, exports=True, columnar=False):
+    results = []
+    exporters = _optional_exporters() if exports else {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for num_days in day_counts:
+            for num_workers in worker_counts:
+                for engine in engines:
+                    case = {'workers': num_workers, 'days': num_days, 'jobs': num_jobs, 'engine': engine}
+                    if columnar:
+                        case['roster'] = 'columnar'
+                    # schedule_shifts mutates the workers, so every repetition gets a fresh roster
+                    roster = lambda: generate_roster(num_workers, num_days, num_jobs, seed, columnar=columnar)
+                    seconds, schedule = _best_time(lambda kwargs: schedule_shifts_by_day(**kwargs, engine=engine), repeat, roster)
+                    shifts = sum(len(dates) for dates in schedule.values())
+                    results.append(dict(case, benchmark='schedule_shifts', seconds=seconds, shifts=shifts))
+                    print(f"schedule_shifts {case}: {seconds:.3f}s, {shifts} shifts", file=sys.stderr)
+
+                if not exports:
+                    continue
+                case = {'workers': num_workers, 'days': num_days, 'jobs': num_jobs, 'shifts': shifts}
+                seconds, _ = _best_time(lambda: prepare_breakdown(schedule), repeat)
+                results.append(dict(case, benchmark='prepare_breakdown', seconds=seconds))
+                seconds, _ = _best_time(lambda: export_schedule_to_csv(schedule, os.path.join(tmp, 'schedule.csv')), repeat)
+                results.append(dict(case, benchmark='export_schedule_to_csv', seconds=seconds))
+                extensions = {'export_schedule_to_pdf': 'pdf', 'export_schedule_to_icalendar': 'ics'}
+                for name, export in exporters.items():
+                    path = os.path.join(tmp, f"schedule.{extensions[name]}")
+                    seconds, _ = _best_time(lambda: export(schedule, path), repeat)
+                    results.append(dict(case, benchmark=name, seconds=seconds))
+                    print(f"{name} {case}: {seconds:.3f}s", file=sys.stderr)
+    return results
+
+def run_startup_benchmarks(repeat=5):
+    # Wall time of fresh interpreters importing the library and running a small headless schedule
+    results = []
+    here = os.path.dirname(os.path.abspath(__file__))
+    with tempfile.TemporaryDirectory() as tmp:
+        roster_path = os.path.join(tmp, 'roster.json')
+        save_roster(generate_roster(10, 30), roster_path)
+        commands = {
+            'python': ['-c', 'pass'],
+            'import shift_scheduler': ['-c', 'import shift_scheduler'],
+            'import main': ['-c', 'import main'],
+            'main.py schedule': [os.path.join(here, 'main.py'), 'schedule', roster_path, '--csv', os.path.join(tmp, 'schedule.csv')],
+        }
+        for name, arguments in commands.items():
+            seconds, _ = _best_time(lambda: subprocess.run([sys.executable] + arguments, cwd=here, check=True, stdout=subprocess.DEVNULL), repeat)
+            results.append({'benchmark': 'startup', 'command': name, 'seconds': seconds})
+            print(f"startup {name}: {seconds * 1000:.0f}ms", file=sys.stderr)
+    return results
+
+def _metadata():
+    try:
+        revision = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        revision = ''
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'revision': revision,
+        'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+def _case_key(result):
+    return tuple(sorted((k, v) for k, v in result.items() if k not in ('seconds', 'shifts')))
+
+def compare_results(previous, current, tolerance=0.2, min_seconds=0.005):
+    """Returns (case, previous seconds, current seconds) for cases slower by more than tolerance.
+
+    Cases faster than min_seconds in both runs are ignored, their timings are mostly noise.
+    """
+    baseline = {_case_key(result): result['seconds'] for result in previous['results']}
+    regressions = []
+    for result in current['results']:
+        before = baseline.get(_case_key(result))
+        if before and result['seconds'] > max(before * (1 + tolerance), min_seconds):
+            regressions.append((_case_key(result), before, result['seconds']))
+    return regressions
+
+def _int_list(value):
+    return [int(item) for item in value.split(',') if item]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the shift scheduler and exporters on synthetic rosters.")
+    parser.add_argument('--workers', type=_int_list, default=DEFAULT_WORKERS, help="comma-separated roster sizes")
+    parser.add_argument('--days', type=_int_list, default=DEFAULT_DAYS, help="comma-separated horizons in days")
+    parser.add_argument('--jobs', type=int, default=3)
+    parser.add_argument('--engines', default="greedy", help="comma-separated scheduling engines")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-exports', action='store_true', help="only time schedule_shifts")
+    parser.add_argument('--no-startup', action='store_true', help="skip the process startup timings")
+    parser.add_argument('--columnar', action='store_true', help="schedule WorkerTable rosters instead of Worker objects")
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--compare', help="previous results file to check for regressions")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="allowed slowdown before a case counts as a regression")
+    parser.add_argument('--min-seconds', type=float, default=0.005, help="ignore regressions in cases faster than this")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.workers, args.days, args.jobs, args.engines.split(','), args.repeat, args.seed, not args.no_exports, args.columnar)
+    if not args.no_startup:
+        results += run_startup_benchmarks(max(args.repeat, 5))
+    report = {'metadata': _metadata(), 'results': results}
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {len(results)} results to {args.output}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+        regressions = compare_results(previous, report, args.tolerance, args.min_seconds)
+        for case, before, after in regressions:
+            print(f"REGRESSION {dict(case)}: {before:.3f}s -> {after:.3f}s", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,17 +1,62 @@
+import logging
 import sys
-from datetime import datetime
+import threading
 from PySide6.QtWidgets import (
-    QTableWidget, QTableWidgetItem, QApplication, QMainWindow, QLabel, QVBoxLayout, QWidget,
-    QLineEdit, QPushButton, QTextEdit, QFileDialog, QGridLayout, QScrollArea
+    QApplication, QMainWindow, QLabel, QVBoxLayout, QHBoxLayout, QWidget, QLineEdit, QPushButton,
+    QFileDialog, QGridLayout, QScrollArea, QProgressBar, QMessageBox, QTableView
 )
 
+from PySide6.QtCore import QThread, QTimer, Signal
 from PySide6.QtGui import QAction
 from worker import Worker
-from shift_scheduler import schedule_shifts, prepare_breakdown, export_breakdown, export_schedule_to_csv
-from icalendar import Calendar, Event
-from pdf_exporter import export_schedule_to_pdf
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
+from shift_scheduler import export_schedule_to_csv, to_day_ordinal, SchedulingCancelled
+from schedule_cache import ScheduleCache, cached_schedule_shifts
+from gui_models import ScheduleTableModel, BreakdownTableModel, MetricsTableModel, ShiftFilter
+from schedule_metrics import ScheduleMetrics, format_score
+
+logger = logging.getLogger(__name__)
+
+class BackgroundTask(QThread):
+    """Runs func(*args, **kwargs) off the UI thread and reports back through signals.
+
+    With cancellable=True, func also gets the progress and should_cancel callbacks of
+    schedule_shifts: the latest progress is kept in latest_progress for the UI thread to poll
+    and the run stops once cancel() is called. Both stay on the Python side: a run reports
+    progress once per day, and PySide6 crashes after a few dozen queued emits from one worker
+    thread, however far apart they are. run() emits exactly one of succeeded, failed or
+    cancelled, well below that.
+    """
+    succeeded = Signal(object)
+    failed = Signal(str)
+    cancelled = Signal()
+
+    def __init__(self, func, *args, cancellable=False, **kwargs):
+        super().__init__()
+        self.cancel_requested = threading.Event()
+        self.latest_progress = None  # (days processed, total days, slots filled)
+        if cancellable:
+            kwargs.update(progress=self.report_progress, should_cancel=self.cancel_requested.is_set)
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+
+    def run(self):
+        try:
+            result = self.func(*self.args, **self.kwargs)
+        except SchedulingCancelled:
+            self.cancelled.emit()
+        except Exception as e:
+            logger.exception("Background task failed")
+            self.failed.emit(str(e))
+        else:
+            self.succeeded.emit(result)
+
+    def report_progress(self, days_done, total_days, slots_filled):
+        self.latest_progress = (days_done, total_days, slots_filled)
+
+    def cancel(self):
+        self.cancel_requested.set()
+        self.requestInterruption()
 
 class MainWindow(QMainWindow):
     def __init__(self):
@@ -26,19 +71,49 @@ class MainWindow(QMainWindow):
         self.max_shifts_per_week_input = QLineEdit()
         self.previous_shifts_input = QLineEdit()
         self.worker_inputs = []
-        self.output_display = QTextEdit()
-        self.output_display.setReadOnly(True)
+        self.schedule_model = ScheduleTableModel(self)
+        self.breakdown_model = BreakdownTableModel(self)
+        self.metrics_model = MetricsTableModel(self)
+        self.output_display = QTableView()
+        self.output_display.setModel(self.schedule_model)
+        self.output_display.setSortingEnabled(True)
+        self.filter_worker_input = QLineEdit()
+        self.filter_job_input = QLineEdit()
+        self.filter_start_input = QLineEdit()
+        self.filter_end_input = QLineEdit()
+        self.schedule_table_button = QPushButton("Schedule by Day")
+        self.metrics_button = QPushButton("Metrics by Worker")
         self.schedule_button = QPushButton("Schedule Shifts")
         self.export_ical_button = QPushButton("Export to iCalendar")
+        self.export_feeds_button = QPushButton("Export iCalendar Feeds per Worker")
         self.export_pdf_button = QPushButton("Export to PDF")
         self.export_csv_button = QPushButton("Export to CSV")
         self.breakdown_button = QPushButton("Breakdown by Worker")
+        self.cancel_button = QPushButton("Cancel")
+        self.cancel_button.setEnabled(False)
+        self.progress_bar = QProgressBar()
+        self.status_label = QLabel()
+        self.summary_label = QLabel()
+        self.summary_label.setWordWrap(True)
+        self.progress_timer = QTimer(self)
+        self.progress_timer.setInterval(100)
+        self.progress_timer.timeout.connect(self.poll_progress)
+        self.task = None
+        self.schedule = None
+        self.roster = None  # (workers, work_periods, holidays, jobs) of the scheduled roster, for the metrics
+        self.cache = ScheduleCache()  # Repeated runs of the same roster in a session come from memory
         # Connect buttons to functions
         self.schedule_button.clicked.connect(self.schedule_shifts)
         self.export_ical_button.clicked.connect(self.export_to_ical)
+        self.export_feeds_button.clicked.connect(self.export_to_feeds)
         self.export_pdf_button.clicked.connect(self.export_to_pdf)
         self.export_csv_button.clicked.connect(self.export_to_csv)
         self.breakdown_button.clicked.connect(self.display_breakdown)
+        self.schedule_table_button.clicked.connect(self.display_schedule)
+        self.metrics_button.clicked.connect(self.display_metrics)
+        for filter_input in (self.filter_worker_input, self.filter_job_input, self.filter_start_input, self.filter_end_input):
+            filter_input.textChanged.connect(self.apply_filter)
+        self.cancel_button.clicked.connect(self.cancel_task)
         # Setup layout
         layout = QVBoxLayout()
         layout.addWidget(QLabel("Enter work periods (comma-separated, e.g., '01/10/2024-10/10/2024'):"))
@@ -71,9 +146,21 @@ class MainWindow(QMainWindow):
         
         layout.addWidget(self.schedule_button)
         layout.addWidget(self.export_ical_button)
+        layout.addWidget(self.export_feeds_button)
         layout.addWidget(self.export_pdf_button)
         layout.addWidget(self.export_csv_button)  # Add the CSV button to the layout
+        layout.addWidget(self.progress_bar)
+        layout.addWidget(self.status_label)
+        layout.addWidget(self.cancel_button)
         layout.addWidget(QLabel("Schedule Output:"))
+        filter_layout = QHBoxLayout()
+        for label, filter_input in (("Worker:", self.filter_worker_input), ("Job:", self.filter_job_input), ("From:", self.filter_start_input), ("To:", self.filter_end_input)):
+            filter_layout.addWidget(QLabel(label))
+            filter_layout.addWidget(filter_input)
+        filter_layout.addWidget(self.schedule_table_button)
+        filter_layout.addWidget(self.metrics_button)
+        layout.addLayout(filter_layout)
+        layout.addWidget(self.summary_label)
         layout.addWidget(self.output_display)
         container = QWidget()
         container.setLayout(layout)
@@ -153,16 +240,36 @@ class MainWindow(QMainWindow):
             )
             for input in self.worker_inputs
         ]
-        # Schedule shifts
-        schedule = schedule_shifts(work_periods, holidays, jobs, workers, min_distance, max_shifts_per_week)
-        # Display the schedule
-        output = ""
-        self.schedule = schedule  # Save the schedule for exporting
-        for job, shifts in schedule.items():
-            output += f"Job {job}:\n"
-            for date, worker in shifts.items():
-                output += f"  {date}: {worker}\n"
-        self.output_display.setText(output)
+        self.roster = (workers, work_periods, holidays, jobs)
+        # Schedule shifts in the background, show_schedule gets the result
+        task = BackgroundTask(cached_schedule_shifts, work_periods, holidays, jobs, workers, min_distance, max_shifts_per_week, cache=self.cache, cancellable=True)
+        self.start_task(task, "Scheduling", self.show_schedule)
+
+    def show_schedule(self, schedule):
+        self.schedule = schedule  # Save the schedule for exporting, keyed by day ordinal
+        self.schedule_model.set_schedule(schedule)
+        self.breakdown_model.set_schedule(schedule)
+        metrics = ScheduleMetrics(*self.roster, schedule)
+        self.metrics_model.set_metrics(metrics)
+        self.summary_label.setText(format_score(metrics.score()))
+        self.display_schedule()
+
+    def display_schedule(self):
+        self.output_display.setModel(self.schedule_model)
+
+    def display_metrics(self):
+        self.output_display.setModel(self.metrics_model)
+
+    def apply_filter(self):
+        # Dates that don't parse (yet) are ignored while the user is typing them
+        def day_or_none(text):
+            try:
+                return to_day_ordinal(text) if text.strip() else None
+            except ValueError:
+                return None
+        shift_filter = ShiftFilter(self.filter_worker_input.text().strip(), self.filter_job_input.text().strip(), day_or_none(self.filter_start_input.text()), day_or_none(self.filter_end_input.text()))
+        self.schedule_model.set_filter(shift_filter)
+        self.breakdown_model.set_filter(shift_filter)
 
     def export_to_ical(self):
         options = QFileDialog.Options()
@@ -170,56 +277,89 @@ class MainWindow(QMainWindow):
         if filePath:
             self.export_icalendar(filePath)
 
+    def export_to_feeds(self):
+        directory = QFileDialog.getExistingDirectory(self, "Select Folder for iCalendar Feeds")
+        if directory:
+            from ical_exporter import export_icalendar_feeds
+            task = BackgroundTask(export_icalendar_feeds, self.schedule, directory, per_job=True)
+            self.start_task(task, "Exporting iCalendar feeds", lambda counts: self.status_label.setText(f"Wrote {counts[0]} iCalendar feeds to {directory}, {counts[1]} unchanged"))
+
     def export_to_pdf(self):
         options = QFileDialog.Options()
         filePath, _ = QFileDialog.getSaveFileName(self, "Save Schedule as PDF", "", "PDF Files (*.pdf);;All Files (*)", options=options)
         if filePath:
-            export_schedule_to_pdf(self.schedule, filePath)
+            from pdf_exporter import export_schedule_to_pdf
+            self.start_task(BackgroundTask(export_schedule_to_pdf, self.schedule, filePath), "Exporting PDF")
 
     def export_icalendar(self, filePath):
-        cal = Calendar()
-        for job, shifts in self.schedule.items():
-            for date_str, worker_id in shifts.items():
-                date = datetime.strptime(date_str, "%d/%m/%Y")
-                event = Event()
-                event.add('summary', f'Shift for Job {job}')
-                event.add('dtstart', date)
-                event.add('dtend', date)
-                event.add('description', f'Worker: {worker_id}')
-                cal.add_component(event)
-        with open(filePath, 'wb') as f:
-            f.write(cal.to_ical())
+        from ical_exporter import export_schedule_to_icalendar
+        self.start_task(BackgroundTask(export_schedule_to_icalendar, self.schedule, filePath), "Exporting iCalendar")
             
     def display_breakdown(self):
-        breakdown = prepare_breakdown(self.schedule)
-        
-        # Create a table widget
-        table = QTableWidget()
-        table.setColumnCount(2)
-        table.setHorizontalHeaderLabels(["Worker", "Shifts Assigned"])
-        
-        # Populate the table with data from the breakdown
-        table.setRowCount(len(breakdown))
-        for row, (worker_id, shifts) in enumerate(breakdown.items()):
-            worker_item = QTableWidgetItem(worker_id)
-            shifts_item = QTableWidgetItem(", ".join([f"{date}: {job}" for date, job in shifts]))
-            table.setItem(row, 0, worker_item)
-            table.setItem(row, 1, shifts_item)
-        
-        # Replace the output display with the table
-        self.output_display.setParent(None)
-        self.output_display = table
-        layout = self.centralWidget().layout()
-        layout.addWidget(self.output_display)
+        self.output_display.setModel(self.breakdown_model)
 
     # Implement the export_to_csv function
     def export_to_csv(self):
         options = QFileDialog.Options()
         filePath, _ = QFileDialog.getSaveFileName(self, "Save Schedule as CSV", "", "CSV Files (*.csv);;All Files (*)", options=options)
         if filePath:
-            export_schedule_to_csv(self.schedule, filePath)
+            self.start_task(BackgroundTask(export_schedule_to_csv, self.schedule, filePath), "Exporting CSV")
+
+    def start_task(self, task, description, on_success=None):
+        # One background task at a time; the buttons that would start another are disabled meanwhile
+        if self.task is not None:
+            return
+        self.task = task
+        self.task_description = description
+        task.succeeded.connect(lambda result: self.status_label.setText(f"{description} finished"))
+        if on_success is not None:
+            task.succeeded.connect(on_success)
+        task.failed.connect(lambda message: QMessageBox.critical(self, "Shift Scheduler", f"{description} failed: {message}"))
+        task.cancelled.connect(lambda: self.status_label.setText(f"{description} cancelled"))
+        task.finished.connect(self.task_finished)
+        self.set_busy(True)
+        self.status_label.setText(f"{description}...")
+        self.progress_bar.setRange(0, 0)  # Busy indicator until progress is reported
+        task.start()
+        self.progress_timer.start()
+
+    def poll_progress(self):
+        if self.task is not None and self.task.latest_progress is not None:
+            self.show_progress(*self.task.latest_progress)
+
+    def show_progress(self, days_done, total_days, slots_filled):
+        self.progress_bar.setRange(0, total_days)
+        self.progress_bar.setValue(days_done)
+        self.status_label.setText(f"{self.task_description}: {days_done}/{total_days} days, {slots_filled} shifts assigned")
+
+    def cancel_task(self):
+        if self.task is not None:
+            self.task.cancel()
+
+    def task_finished(self):
+        self.progress_timer.stop()
+        self.task.deleteLater()
+        self.task = None
+        self.progress_bar.setRange(0, 1)
+        self.progress_bar.setValue(1)
+        self.set_busy(False)
+
+    def set_busy(self, busy):
+        for button in (self.schedule_button, self.breakdown_button, self.metrics_button, self.export_ical_button, self.export_feeds_button, self.export_pdf_button, self.export_csv_button):
+            button.setEnabled(not busy)
+        self.cancel_button.setEnabled(busy)
+
+    def closeEvent(self, event):
+        if self.task is not None:
+            self.task.cancel()
+            self.task.wait()
+        super().closeEvent(event)
             
-app = QApplication(sys.argv)
-window = MainWindow()
-window.show()
-sys.exit(app.exec())
+def main():
+    app = QApplication.instance() or QApplication(sys.argv)
+    window = MainWindow()
+    window.show()
+    return app.exec()
+
+if __name__ == "__main__":
+    sys.exit(main())
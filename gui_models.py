@@ -0,0 +1,205 @@
+from PySide6.QtCore import QAbstractTableModel, QModelIndex, Qt
+from shift_scheduler import iter_shifts, prepare_breakdown, to_day_ordinal, format_day
+
+class ShiftFilter:
+    """Worker (case-insensitive substring), job and inclusive day-ordinal range filters; None matches anything."""
+
+    def __init__(self, worker=None, job=None, start=None, end=None):
+        self.worker = worker.lower() if worker else None
+        self.job = job or None
+        self.start = start
+        self.end = end
+
+    def matches(self, day, job, worker_id):
+        if self.worker is not None and self.worker not in str(worker_id).lower():
+            return False
+        if self.job is not None and str(job) != self.job:
+            return False
+        if self.start is not None and day < self.start:
+            return False
+        return self.end is None or day <= self.end
+
+    def active(self):
+        return any(value is not None for value in (self.worker, self.job, self.start, self.end))
+
+class ScheduleTableModel(QAbstractTableModel):
+    """One row per shift (date, job, worker), sorted and filtered on the row index.
+
+    Cell text is formatted in data(), so views only pay for the rows they show.
+    """
+    HEADERS = ("Date", "Job", "Worker")
+    SORT_KEYS = (lambda row: row, lambda row: (str(row[1]), row[0]), lambda row: (str(row[2]), row[0]))
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._shifts = []
+        self._rows = []
+        self._filter = ShiftFilter()
+        self._sort = (0, Qt.AscendingOrder)
+
+    def set_schedule(self, schedule):
+        self.beginResetModel()
+        self._shifts = sorted(iter_shifts(schedule), key=lambda row: (row[0], str(row[1])))
+        self._update_rows()
+        self.endResetModel()
+
+    def set_filter(self, shift_filter):
+        self.beginResetModel()
+        self._filter = shift_filter
+        self._update_rows()
+        self.endResetModel()
+
+    def _update_rows(self):
+        rows = [row for row in self._shifts if self._filter.matches(*row)] if self._filter.active() else list(self._shifts)
+        column, order = self._sort
+        rows.sort(key=self.SORT_KEYS[column], reverse=order == Qt.DescendingOrder)
+        self._rows = rows
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        day, job, worker_id = self._rows[index.row()]
+        if role == Qt.DisplayRole:
+            return (format_day(day), str(job), str(worker_id))[index.column()]
+        if role == Qt.UserRole:
+            return (day, job, worker_id)[index.column()]
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return None
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        self.layoutAboutToBeChanged.emit()
+        self._sort = (column, order)
+        self._rows.sort(key=self.SORT_KEYS[column], reverse=order == Qt.DescendingOrder)
+        self.layoutChanged.emit()
+
+class BreakdownTableModel(QAbstractTableModel):
+    """One row per worker with their shift count and shifts, built from prepare_breakdown.
+
+    Filters restrict the shifts counted for each worker; workers left without shifts are
+    hidden while a filter is active. The shift list of a row is only joined when displayed.
+    """
+    HEADERS = ("Worker", "Shifts", "Shifts Assigned")
+    SORT_KEYS = (lambda row: str(row[0]), lambda row: (len(row[1]), str(row[0])), lambda row: (row[1][:1], str(row[0])))
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._breakdown = []
+        self._rows = []
+        self._filter = ShiftFilter()
+        self._sort = (0, Qt.AscendingOrder)
+
+    def set_schedule(self, schedule):
+        self.beginResetModel()
+        self._breakdown = [(worker_id, sorted((to_day_ordinal(day), job) for day, job in shifts)) for worker_id, shifts in prepare_breakdown(schedule).items()]
+        self._update_rows()
+        self.endResetModel()
+
+    def set_filter(self, shift_filter):
+        self.beginResetModel()
+        self._filter = shift_filter
+        self._update_rows()
+        self.endResetModel()
+
+    def _update_rows(self):
+        if self._filter.active():
+            rows = [(worker_id, [(day, job) for day, job in shifts if self._filter.matches(day, job, worker_id)]) for worker_id, shifts in self._breakdown]
+            rows = [row for row in rows if row[1]]
+        else:
+            rows = list(self._breakdown)
+        column, order = self._sort
+        rows.sort(key=self.SORT_KEYS[column], reverse=order == Qt.DescendingOrder)
+        self._rows = rows
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.UserRole):
+            return None
+        worker_id, shifts = self._rows[index.row()]
+        if index.column() == 0:
+            return str(worker_id) if role == Qt.DisplayRole else worker_id
+        if index.column() == 1:
+            return len(shifts)
+        if role == Qt.UserRole:
+            return shifts
+        return ", ".join(f"{format_day(day)}: {job}" for day, job in shifts)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return None
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        self.layoutAboutToBeChanged.emit()
+        self._sort = (column, order)
+        self._rows.sort(key=self.SORT_KEYS[column], reverse=order == Qt.DescendingOrder)
+        self.layoutChanged.emit()
+
+class MetricsTableModel(QAbstractTableModel):
+    """One row per worker from ScheduleMetrics.worker_summary: shifts against quota and fairness spreads."""
+    HEADERS = ("Worker", "Shifts", "Quota", "Deviation", "Weekend", "Weekend %", "Job Spread", "Weekday Spread")
+    FIELDS = ('worker', 'shifts', 'quota', 'deviation', 'weekend', 'weekend_share', 'job_spread', 'rotation_spread')
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._rows = []
+        self._sort = (0, Qt.AscendingOrder)
+
+    def set_metrics(self, metrics):
+        self.beginResetModel()
+        self._rows = metrics.worker_summary()
+        self._sort_rows()
+        self.endResetModel()
+
+    def _sort_rows(self):
+        column, order = self._sort
+        field = self.FIELDS[column]
+        self._rows.sort(key=lambda row: str(row[field]) if column == 0 else row[field], reverse=order == Qt.DescendingOrder)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        field = self.FIELDS[index.column()]
+        value = self._rows[index.row()][field]
+        if role == Qt.UserRole:
+            return value
+        if role != Qt.DisplayRole:
+            return None
+        if field == 'worker':
+            return str(value)
+        if field == 'weekend_share':
+            return f"{value:.0%}"
+        if field == 'deviation':
+            return f"{value:+.1f}"
+        return f"{value:.1f}" if isinstance(value, float) else value
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return None
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        self.layoutAboutToBeChanged.emit()
+        self._sort = (column, order)
+        self._sort_rows()
+        self.layoutChanged.emit()
@@ -0,0 +1,126 @@
+import hashlib
+import json
+import logging
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, date
+from icalendar import Calendar, Event
+from shift_scheduler import iter_shifts, prepare_breakdown, to_day_ordinal, timed_phase
+
+logger = logging.getLogger(__name__)
+
+# Part of every shard hash, bump it when the event format below changes
+FEED_FORMAT_VERSION = 2
+MANIFEST_NAME = '.feeds.json'
+
+def export_schedule_to_icalendar(schedule, filename='shift_schedule.ics', stats=None):
+    with timed_phase(stats, "export_icalendar"):
+        cal = Calendar()
+        for day, job, worker_id in iter_shifts(schedule):
+            shift_date = datetime.fromordinal(day)
+            event = Event()
+            event.add('summary', f'Shift for Job {job}')
+            event.add('dtstart', shift_date)
+            event.add('dtend', shift_date)
+            event.add('description', f'Worker: {worker_id}')
+            cal.add_component(event)
+        with open(filename, 'wb') as f:
+            f.write(cal.to_ical())
+
+def _escape(text):
+    return str(text).replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace('\n', '\\n')
+
+def _fold(line):
+    # Content lines are folded at 75 octets (RFC 5545, 3.1)
+    data = line.encode('utf-8')
+    if len(data) <= 75:
+        return line + '\r\n'
+    parts = []
+    while data:
+        limit = 75 if not parts else 74
+        cut = min(limit, len(data))
+        while cut < len(data) and (data[cut] & 0xC0) == 0x80:
+            cut -= 1  # Don't split a multi-byte character
+        parts.append(data[:cut].decode('utf-8'))
+        data = data[cut:]
+    return '\r\n '.join(parts) + '\r\n'
+
+def _write_feed(path, name, events):
+    # Streams one feed to disk event by event; events are sorted (day ordinal, job, worker id).
+    # DTSTAMP is the shift day at midnight UTC, so an unchanged shift exports byte for byte alike
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write('BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//Shift Scheduler//EN\r\n')
+        f.write(_fold(f'X-WR-CALNAME:{_escape(name)}'))
+        for day, job, worker_id in events:
+            stamp = date.fromordinal(day).strftime('%Y%m%dT000000')
+            f.write('BEGIN:VEVENT\r\n')
+            f.write(_fold(f'UID:{day}-{_escape(job)}-{_escape(worker_id)}@shift-scheduler'))
+            f.write(_fold(f'SUMMARY:Shift for Job {_escape(job)}'))
+            f.write(f'DTSTAMP:{stamp}Z\r\nDTSTART:{stamp}\r\nDTEND:{stamp}\r\n')
+            f.write(_fold(f'DESCRIPTION:Worker: {_escape(worker_id)}'))
+            f.write('END:VEVENT\r\n')
+        f.write('END:VCALENDAR\r\n')
+
+def _shard_hash(name, events):
+    digest = hashlib.sha256(f'{FEED_FORMAT_VERSION}|{name}'.encode('utf-8'))
+    for event in events:
+        digest.update(repr(event).encode('utf-8'))
+    return digest.hexdigest()
+
+def _feed_filename(prefix, key):
+    # Keys that need other characters replaced get a hash of the raw key after a "~", which the
+    # replacement never leaves, so "W 1" and "W_1" get different files
+    safe = re.sub(r'[^A-Za-z0-9_.-]', '_', str(key))
+    if safe != str(key):
+        safe += '~' + hashlib.sha1(str(key).encode('utf-8')).hexdigest()[:8]
+    return f"{prefix}_{safe}.ics"
+
+def export_icalendar_feeds(schedule, directory, per_job=False, max_workers=None, stats=None):
+    """Writes one .ics feed per worker, and with per_job one per job, into directory.
+
+    Shards are grouped with prepare_breakdown and written by a thread pool, each streamed
+    event by event. A manifest of shard hashes in the directory lets a re-export skip feeds
+    whose shifts did not change and removes feeds left without shifts. Returns
+    (feeds written, feeds skipped).
+    """
+    with timed_phase(stats, "export_icalendar_feeds"):
+        os.makedirs(directory, exist_ok=True)
+        shards = {}
+        for worker_id, shifts in prepare_breakdown(schedule).items():
+            shards[_feed_filename('worker', worker_id)] = (f'Shifts of {worker_id}', sorted((to_day_ordinal(day), job, worker_id) for day, job in shifts))
+        if per_job:
+            by_job = {}
+            for day, job, worker_id in iter_shifts(schedule):
+                by_job.setdefault(job, []).append((day, job, worker_id))
+            for job, events in by_job.items():
+                shards[_feed_filename('job', job)] = (f'Shifts for Job {job}', sorted(events))
+
+        manifest_path = os.path.join(directory, MANIFEST_NAME)
+        try:
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            manifest = {}
+
+        hashes = {}
+        pending = []
+        for filename, (name, events) in shards.items():
+            hashes[filename] = _shard_hash(name, events)
+            path = os.path.join(directory, filename)
+            if manifest.get(filename) != hashes[filename] or not os.path.exists(path):
+                pending.append((path, name, events))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for future in [executor.submit(_write_feed, *shard) for shard in pending]:
+                future.result()
+
+        for filename in manifest.keys() - hashes.keys():
+            # Feeds we wrote before for workers or jobs that no longer have shifts
+            try:
+                os.remove(os.path.join(directory, filename))
+            except OSError:
+                pass
+        with open(manifest_path, 'w') as f:
+            json.dump(hashes, f, indent=1, sort_keys=True)
+        logger.info("Wrote %d iCalendar feeds to %s, %d unchanged", len(pending), directory, len(shards) - len(pending))
+        return len(pending), len(shards) - len(pending)
@@ -1,49 +1,197 @@
-from cli import run_cli
+"""Entry point for the shift scheduler.
+
+`python main.py` opens the GUI, `python main.py cli` asks for a roster interactively and
+`python main.py schedule roster.json --csv schedule.csv` schedules without a display, and
+`python main.py batch rosters/` schedules a directory of rosters in parallel. --history keeps
+past shifts in a shift_history file so rest limits carry over between runs, and
+`python main.py verify roster.json schedule.csv` lists the rules a schedule breaks.
+`python main.py serve` keeps warm scheduler processes behind a local socket, which
+`python main.py submit roster.json` sends rosters to, see schedule_service.
+`python main.py sweep roster.json --min-distance 1,2,3` compares schedules across rule
+variants. Qt and the exporters are only imported by the commands that use them, so headless
+runs start fast.
+"""
+import argparse
+import logging
 import sys
-from PySide6.QtWidgets import QApplication
-from gui import MainWindow
-from worker import Worker
-from shift_scheduler import schedule_shifts, prepare_breakdown, export_breakdown
 
-if __name__ == "__main__":
-    app = QApplication.instance()
-    if app is None:
-        app = QApplication(sys.argv)
+def run_schedule(args):
+    from roster_io import load_roster
+    from shift_scheduler import schedule_shifts_by_day, export_schedule_to_csv
+
+    roster = load_roster(args.roster)
+    history = None
+    if args.history:
+        from shift_history import ShiftHistory
+        history = ShiftHistory(args.history)
+        roster['previous_shifts'] = history.previous_shifts(roster['work_periods'], roster['min_distance'], roster['workers'])
+    if args.cache_dir:
+        from schedule_cache import ScheduleCache, cached_schedule_shifts
+        schedule = cached_schedule_shifts(**roster, engine=args.engine, cache=ScheduleCache(args.cache_dir))
     else:
-        print("QApplication instance already exists.")
-
-    window = MainWindow()
-    window.show()
-
-    # User input for the required parameters
-    work_periods = input("Enter work periods (e.g., 01/10/2024-31/10/2024, separated by commas): ").split(',')
-    holidays = input("Enter holidays (e.g., 09/10/2024, separated by commas): ").split(',')
-    jobs = input("Enter workstations (e.g., A, B, C, separated by commas): ").split(',')
-    min_distance = int(input("Enter minimum distance between work shifts (in days): "))
-    max_shifts_per_week = int(input("Enter maximum shifts that can be assigned per week: "))
-    num_workers = int(input("Enter number of available workers: "))
-
-    # Example worker data, replace with actual data as needed
-    workers = [
-        Worker.from_user_input(
-            identification=f"W{i+1}",
-            working_dates="01/10/2024-15/10/2024,20/10/2024-31/10/2024",
-            percentage_shifts=100.0,
-            group='1',
-            position_incompatibility="",
-            group_incompatibility="",
-            obligatory_coverage="",
-            unavailable_dates=""
-        ) for i in range(num_workers)
-    ]
-
-    # Schedule shifts
-    schedule = schedule_shifts(work_periods, holidays, jobs, workers, min_distance, max_shifts_per_week)
-    breakdown = prepare_breakdown(schedule)
-    export_breakdown(breakdown)
-    
-    export_schedule_to_csv(schedule)  # Call the CSV export function
-
-    print("Schedule exported to CSV successfully.")
-    
-    sys.exit(app.exec())
+        schedule = schedule_shifts_by_day(**roster, engine=args.engine)
+    if history is not None:
+        history.append(schedule)
+    if args.csv:
+        export_schedule_to_csv(schedule, args.csv)
+    if args.pdf:
+        from pdf_exporter import export_schedule_to_pdf
+        export_schedule_to_pdf(schedule, args.pdf)
+    if args.ics:
+        from ical_exporter import export_schedule_to_icalendar
+        export_schedule_to_icalendar(schedule, args.ics)
+    shifts = sum(len(dates) for dates in schedule.values())
+    print(f"Scheduled {shifts} shifts for {len(roster['workers'])} workers")
+    return 0
+
+def run_batch(args):
+    import time
+    from batch import schedule_batch, format_summary
+
+    start = time.perf_counter()
+    results = schedule_batch(args.directory, args.output_dir, args.engine, not args.no_csv, args.pdf, args.processes, args.history_dir)
+    print(format_summary(results, time.perf_counter() - start))
+    return 1 if any(result['error'] is not None for result in results) else 0
+
+def run_verify(args):
+    from roster_io import load_roster
+    from shift_scheduler import import_schedule_from_csv
+    from schedule_verifier import verify_schedule, count_violations
+
+    roster = load_roster(args.roster)
+    schedule = import_schedule_from_csv(args.schedule)
+    previous_shifts = ()
+    if args.history:
+        from shift_history import ShiftHistory
+        previous_shifts = ShiftHistory(args.history).previous_shifts(roster['work_periods'], roster['min_distance'], roster['workers'])
+    violations = verify_schedule(schedule, roster['work_periods'], roster['holidays'], roster['workers'], roster['min_distance'], roster['max_shifts_per_week'], previous_shifts)
+    for violation in violations:
+        print(violation)
+    counts = ', '.join(f"{count} {rule}" for rule, count in sorted(count_violations(violations).items()))
+    print(f"{len(violations)} violations" + (f": {counts}" if counts else ""))
+    return 1 if violations else 0
+
+def run_serve(args):
+    import asyncio
+    from schedule_service import serve
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.socket, args.processes, args.max_jobs))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+def run_submit(args):
+    import asyncio
+    from roster_io import read_roster_dict
+    from schedule_service import request_schedule
+
+    def show(event):
+        if event['event'] == 'progress':
+            print(f"Job {event['job']}: {event['days_done']}/{event['total_days']} days, {event['slots_filled']} shifts assigned", file=sys.stderr)
+        elif event['event'] == 'queued' and event['duplicate']:
+            print(f"Joined job {event['job']}, already in progress", file=sys.stderr)
+
+    event = asyncio.run(request_schedule(read_roster_dict(args.roster), args.engine, host=args.host, port=args.port, path=args.socket, on_event=show))
+    if event['event'] != 'done':
+        print(f"Job {event.get('job')} {event['event']}: {event.get('error', '')}".rstrip(': '), file=sys.stderr)
+        return 1
+    if args.csv:
+        from shift_scheduler import export_schedule_to_csv
+        export_schedule_to_csv(event['schedule'], args.csv)
+    shifts = sum(len(dates) for dates in event['schedule'].values())
+    print(f"Scheduled {shifts} shifts in {event['seconds']:.2f}s")
+    return 0
+
+def _int_list(text):
+    return [int(value) for value in text.split(',') if value.strip()]
+
+def _percentages(text):
+    # "W1=50,W2=80" -> {'W1': 50.0, 'W2': 80.0}; an empty string keeps the roster's
+    percentages = {}
+    for item in text.split(','):
+        if item.strip():
+            worker_id, _, percentage = item.partition('=')
+            percentages[worker_id.strip()] = float(percentage)
+    return percentages
+
+def run_sweep(args):
+    from roster_io import load_roster
+    from sweep import sweep_grid, run_sweep as sweep, format_sweep
+
+    roster = load_roster(args.roster)
+    job_lists = [[job.strip() for job in jobs.split(',') if job.strip()] for jobs in args.jobs] if args.jobs else None
+    points = sweep_grid(roster, args.min_distance, args.max_shifts, job_lists, args.percentages)
+    print(format_sweep(sweep(roster, points, args.engine, args.processes)))
+    return 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Distribute on-call shifts.")
+    parser.add_argument('--log-level', default='WARNING')
+    commands = parser.add_subparsers(dest='command')
+    commands.add_parser('gui', help="open the GUI (default)")
+    commands.add_parser('cli', help="enter a roster interactively")
+    schedule = commands.add_parser('schedule', help="schedule a JSON roster without a display")
+    schedule.add_argument('roster', help="roster definition, see roster_io")
+    schedule.add_argument('--engine', default='greedy', choices=('greedy', 'numpy', 'matching'), help="matching keeps filling days after a job nobody can take")
+    schedule.add_argument('--cache-dir', help="reuse schedules of identical rosters stored in this directory")
+    schedule.add_argument('--csv', help="write the schedule to this CSV file")
+    schedule.add_argument('--pdf', help="write the calendar to this PDF file")
+    schedule.add_argument('--ics', help="write the schedule to this iCalendar file")
+    schedule.add_argument('--history', help="shift history file: seeds the run with past shifts and records the new ones")
+    batch = commands.add_parser('batch', help="schedule every JSON/CSV roster in a directory in parallel")
+    batch.add_argument('directory', help="directory of roster definitions, see roster_io")
+    batch.add_argument('--output-dir', help="where to write the schedules (default: DIRECTORY/schedules)")
+    batch.add_argument('--engine', default='greedy', choices=('greedy', 'numpy', 'matching'))
+    batch.add_argument('--processes', type=int, help="pool size (default: one per CPU)")
+    batch.add_argument('--pdf', action='store_true', help="also write a PDF calendar per roster")
+    batch.add_argument('--no-csv', action='store_true', help="do not write the CSV schedules")
+    batch.add_argument('--history-dir', help="keep a shift history per roster (<name>.history) in this directory")
+    verify = commands.add_parser('verify', help="check a CSV schedule against the rules of a roster")
+    verify.add_argument('roster', help="roster definition, see roster_io")
+    verify.add_argument('schedule', help="schedule CSV in the layout of --csv (Job, Date, Worker)")
+    verify.add_argument('--history', help="shift history file whose shifts before the schedule count towards its limits")
+    for name, help_text in (('serve', "run the local scheduling service"), ('submit', "schedule a roster through a running service")):
+        command = commands.add_parser(name, help=help_text)
+        if name == 'submit':
+            command.add_argument('roster', help="roster definition, see roster_io")
+            command.add_argument('--engine', default='greedy', choices=('greedy', 'numpy', 'matching'))
+            command.add_argument('--csv', help="write the schedule to this CSV file")
+        else:
+            command.add_argument('--processes', type=int, help="warm worker processes (default: one per CPU)")
+            command.add_argument('--max-jobs', type=int, help="jobs running at once (default: one per process)")
+        command.add_argument('--host', default='127.0.0.1')
+        command.add_argument('--port', type=int, default=8765)
+        command.add_argument('--socket', help="Unix socket path to use instead of host and port")
+    sweep = commands.add_parser('sweep', help="schedule a roster over a grid of rule variants and compare the results")
+    sweep.add_argument('roster', help="roster definition, see roster_io")
+    sweep.add_argument('--min-distance', type=_int_list, help="comma-separated values to try (default: the roster's)")
+    sweep.add_argument('--max-shifts', type=_int_list, help="comma-separated max_shifts_per_week values to try")
+    sweep.add_argument('--jobs', action='append', help="a comma-separated job list to try, repeat for more")
+    sweep.add_argument('--percentages', type=_percentages, action='append', help="worker percentages to try, e.g. W1=50,W2=80, repeat for more ('' for the roster's)")
+    sweep.add_argument('--engine', default='greedy', choices=('greedy', 'numpy', 'matching'))
+    sweep.add_argument('--processes', type=int, help="pool size (default: one per CPU)")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=args.log_level.upper())
+
+    if args.command == 'schedule':
+        return run_schedule(args)
+    if args.command == 'batch':
+        return run_batch(args)
+    if args.command == 'verify':
+        return run_verify(args)
+    if args.command == 'serve':
+        return run_serve(args)
+    if args.command == 'submit':
+        return run_submit(args)
+    if args.command == 'sweep':
+        return run_sweep(args)
+    if args.command == 'cli':
+        from cli import run_cli
+        run_cli()
+        return 0
+    import gui
+    return gui.main()
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,196 @@
+import heapq
+import logging
+from bisect import bisect_left
+from shift_scheduler import format_day, group_conflict, GROUP_INCOMPATIBILITY, JOB_REPETITION
+
+logger = logging.getLogger(__name__)
+
+# Edge tiers, cheapest first: passes every constraint with quota left, passes every constraint
+# over quota, and the override fallback (only unavailable dates checked) with and without quota
+STRICT, STRICT_OVER_QUOTA, OVERRIDE, OVERRIDE_OVER_QUOTA = range(4)
+
+def min_cost_matching(edges):
+    """Maximum cardinality, minimum cost bipartite matching.
+
+    edges[left] lists (right, cost) pairs with cost >= 0, right being any hashable. Runs
+    successive shortest augmenting paths (Dijkstra over reduced costs with node potentials),
+    so every augmentation adds one matched pair at the least extra cost. Returns the matched
+    right per left, None where left stays unmatched.
+    """
+    match_left = [None] * len(edges)
+    match_right = {}
+    cost = [dict(pairs) for pairs in edges]
+    potential_left = [0.0] * len(edges)
+    potential_right = {right: 0.0 for pairs in cost for right in pairs}
+    for _ in range(len(edges)):
+        dist_left = {left: 0.0 for left in range(len(edges)) if match_left[left] is None}
+        dist_right = {}
+        previous = {}
+        heap = [(0.0, 0, left) for left in dist_left]
+        done = set()
+        end = None
+        while heap:
+            dist, side, node = heapq.heappop(heap)
+            if (side, node) in done:
+                continue
+            done.add((side, node))
+            if side == 0:
+                for right, edge_cost in cost[node].items():
+                    if match_left[node] == right:
+                        continue
+                    reduced = dist + edge_cost + potential_left[node] - potential_right[right]
+                    if (1, right) not in done and reduced < dist_right.get(right, float('inf')):
+                        dist_right[right] = reduced
+                        previous[right] = node
+                        heapq.heappush(heap, (reduced, 1, right))
+            elif node not in match_right:
+                end = node
+                break
+            else:
+                left = match_right[node]
+                reduced = dist - cost[left][node] + potential_right[node] - potential_left[left]
+                if (0, left) not in done and reduced < dist_left.get(left, float('inf')):
+                    dist_left[left] = reduced
+                    heapq.heappush(heap, (reduced, 0, left))
+        if end is None:
+            break
+        # Nodes the search did not settle are at least limit away, which keeps every reduced cost >= 0
+        limit = dist_right[end]
+        for left in range(len(edges)):
+            potential_left[left] += min(dist_left.get(left, limit), limit)
+        for right in potential_right:
+            potential_right[right] += min(dist_right.get(right, limit), limit)
+        right = end
+        while right is not None:
+            left = previous[right]
+            right, match_left[left] = match_left[left], right
+            match_right[match_left[left]] = left
+    return match_left
+
+class CoverageLookahead:
+    """Remaining chances of each worker to work, counted over the rest of the run's days.
+
+    A worker's chances on a day are the run days from then on that fall in their working
+    periods and not on their unavailable dates. Suffix counts are shared by workers with the
+    same working periods, like the AvailabilityIndex bytearrays they are built from.
+    """
+
+    def __init__(self, run):
+        self.days = list(run.days())
+        self.positions = {day: position for position, day in enumerate(self.days)}
+        index = run.availability
+        shared = {}
+        self.suffix = {}
+        self.unavailable = {}
+        for worker in run.workers:
+            working = index.working[worker.identification]
+            suffix = shared.get(id(working))
+            if suffix is None:
+                suffix = [0] * (len(self.days) + 1)
+                for position in range(len(self.days) - 1, -1, -1):
+                    suffix[position] = suffix[position + 1] + index.in_work_period(worker.identification, self.days[position])
+                shared[id(working)] = suffix
+            self.suffix[worker.identification] = suffix
+            self.unavailable[worker.identification] = sorted(day for day in index.unavailable[worker.identification] if day in self.positions and index.in_work_period(worker.identification, day))
+
+    def chances(self, worker_id, day):
+        unavailable = self.unavailable[worker_id]
+        return self.suffix[worker_id][self.positions[day]] - (len(unavailable) - bisect_left(unavailable, day))
+
+def _shaping(run, lookahead, worker, day, job, chances):
+    # Cost within a tier, in [0, 1): favours workers furthest behind their quota relative to
+    # the chances they have left, then the longest rested, then the greedy's rotation flags
+    urgency = min(max(worker.shift_quota, 0) / chances, 1.0) if chances > 0 else 0.0
+    last_day = run.last_day_of(worker)
+    rest = 0.0 if last_day is None else 1.0 / (1 + abs(day - last_day))  # Obligatory shifts can lie ahead
+    flags = run.tie_break(worker, day, job)
+    return 0.99 * (0.5 * (1 - urgency) + 0.4 * rest + 0.1 * (len(flags) - sum(flags)) / len(flags))
+
+def _edges(run, lookahead, day, open_jobs, excluded):
+    # Candidate edges of one day. The pool is the workers with the cheapest job-independent
+    # cost, enough for every open job to keep len(open_jobs) + 1 options; tiers are filled
+    # cheapest first, so _shaping only runs for the workers of the tiers the pool reaches
+    tier_cost = float(len(run.jobs))
+    working_today = set(run.occupancy[day].values())
+    tiers = ([], [], [], [])
+    for position, worker in enumerate(run.workers):
+        worker_id = worker.identification
+        if worker_id in working_today:
+            continue
+        reason = run.rejection_reason(worker, day, open_jobs[0])
+        if reason is None or reason == JOB_REPETITION:
+            tier = STRICT if worker.shift_quota > 0 else STRICT_OVER_QUOTA
+            if worker_id in excluded:
+                tier += OVERRIDE
+        elif run.availability.is_unavailable(worker_id, day):
+            continue
+        else:
+            tier = OVERRIDE if worker.shift_quota > 0 else OVERRIDE_OVER_QUOTA
+            if run.stats is not None:
+                run.stats.rejections[reason] += 1
+        tiers[tier].append(position)
+    pool = []
+    size = len(open_jobs) * (len(open_jobs) + 1)
+    for tier, positions in enumerate(tiers):
+        if len(pool) >= size:
+            break
+        scored = [(_shaping(run, lookahead, run.workers[position], day, open_jobs[0], lookahead.chances(run.workers[position].identification, day)), position) for position in positions]
+        pool += [(position, tier) for _, position in heapq.nsmallest(size - len(pool), scored)]
+    edges = []
+    for job in open_jobs:
+        job_edges = []
+        for position, tier in pool:
+            worker = run.workers[position]
+            if tier < OVERRIDE and run.rejection_reason(worker, day, job) is not None:
+                tier += OVERRIDE
+            job_edges.append((position, tier * tier_cost + _shaping(run, lookahead, worker, day, job, lookahead.chances(worker.identification, day))))
+        edges.append(job_edges)
+    return edges
+
+def _group_conflicts(run, day, placements):
+    # Workers in a group conflict (either way) with someone placed before them in job order, as
+    # the greedy would have seen it; override placements skip the check as usual
+    conflicts = set()
+    assigned = list(run.occupancy[day].values())
+    for position, override in placements:
+        worker = run.workers[position]
+        if not override and group_conflict(worker, assigned, run.worker_groups, run.worker_incompatibility):
+            conflicts.add(worker.identification)
+        assigned.append(worker.identification)
+    return conflicts
+
+def fill_matching(run):
+    """Fills each day's open jobs with a min-cost bipartite matching between jobs and workers.
+
+    The matching covers as many of the day's jobs as any assignment could, preferring edges
+    that pass every constraint, then the same over quota, then the override fallback, and
+    within a tier the cost from _shaping. A job nobody can take is left empty and the run goes
+    on with the next day, where fill_greedy would stop.
+    """
+    lookahead = CoverageLookahead(run)
+    for days_done, day in enumerate(run.days()):
+        run.checkpoint(days_done)
+        open_jobs = [job for job in run.jobs if job not in run.occupancy[day]]
+        if not open_jobs:
+            continue  # Every job has an obligatory coverage shift
+        excluded = set()
+        while True:
+            # Group incompatibilities between workers matched on the same day only show up
+            # after matching; the offenders lose their strict edges and the day is matched again
+            edges = _edges(run, lookahead, day, open_jobs, excluded)
+            matched = min_cost_matching(edges)
+            placements = [(position, dict(job_edges)[position] >= OVERRIDE * len(run.jobs)) for job_edges, position in zip(edges, matched) if position is not None]
+            conflicts = _group_conflicts(run, day, placements) - excluded
+            if not conflicts:
+                break
+            excluded |= conflicts
+            if run.stats is not None:
+                run.stats.rejections[GROUP_INCOMPATIBILITY] += len(conflicts)
+        for job, position in zip(open_jobs, matched):
+            if position is None:
+                logger.warning("No available workers for job %s on %s, leaving it empty", job, format_day(day))
+                continue
+            override = dict(placements)[position]
+            if override and run.stats is not None:
+                run.stats.override_fallbacks += 1
+            run.assign(run.workers[position], day, job)
@@ -0,0 +1,88 @@
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from shift_scheduler import schedule_shifts_by_day, SchedulingCancelled
+from schedule_metrics import ScheduleMetrics
+
+logger = logging.getLogger(__name__)
+
+def score_schedule(schedule, workers, work_periods, holidays, jobs):
+    """Scores a day-ordinal schedule on coverage, quota deviation and weekend balance.
+
+    Returns the schedule_metrics.ScheduleMetrics score dict, whose 'key' tuple sorts better
+    schedules first: higher coverage, then lower mean deviation from each worker's
+    percentage-based quota, then a lower spread of weekend/holiday shifts per full-time
+    equivalent.
+    """
+    return ScheduleMetrics(workers, work_periods, holidays, jobs, schedule).score()
+
+# Shared flags of a pool, set by _init_attempt: 1 once any attempt has finished, and 1 once
+# schedule_shifts_multistart returns
+_finished = None
+_stop = None
+
+def _init_attempt(finished, stop):
+    global _finished, _stop
+    _finished = finished
+    _stop = stop
+
+def _run_attempt(work_periods, holidays, jobs, workers, min_distance, max_shifts_per_week, engine, seed, deadline):
+    # Runs in a pool process on its own copy of the workers. Past the deadline (a time.time()
+    # value) the run stops at its next day once another attempt has finished, and so does every
+    # run once schedule_shifts_multistart returns; a stopped run returns None
+    should_cancel = lambda: _stop.value == 1 or (deadline is not None and _finished.value == 1 and time.time() >= deadline)
+    start = time.perf_counter()
+    try:
+        schedule = schedule_shifts_by_day(work_periods, holidays, jobs, workers, min_distance, max_shifts_per_week, engine=engine, seed=seed, should_cancel=should_cancel)
+    except SchedulingCancelled:
+        return None
+    _finished.value = 1
+    score = score_schedule(schedule, workers, work_periods, holidays, jobs)
+    score['seed'] = seed
+    score['seconds'] = time.perf_counter() - start
+    return schedule, score
+
+def schedule_shifts_multistart(work_periods, holidays, jobs, workers, min_distance, max_shifts_per_week, attempts=None, time_budget=None, engine="greedy", max_workers=None):
+    """Runs several seeded scheduling attempts in a process pool and keeps the best one.
+
+    Attempt 0 is the unseeded, deterministic schedule_shifts run, so the result is never worse
+    than a single run. attempts defaults to one per CPU. With time_budget (seconds), attempts
+    still running when it expires stop at their next day and queued ones never start, unless
+    none has finished yet, in which case the first to finish is used. Equal scores go to the
+    earlier attempt, whatever order they finish in. Returns (day-ordinal schedule, score dict).
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    attempts = attempts or max_workers
+    seeds = [None] + list(range(1, attempts))
+    deadline = time.time() + time_budget if time_budget is not None else None
+
+    best = None  # (score key, attempt index, schedule, score)
+    stop = multiprocessing.Value('b', 0, lock=False)
+    executor = ProcessPoolExecutor(max_workers=min(max_workers, attempts), initializer=_init_attempt, initargs=(multiprocessing.Value('b', 0, lock=False), stop))
+    try:
+        attempt_of = {executor.submit(_run_attempt, work_periods, holidays, jobs, workers, min_distance, max_shifts_per_week, engine, seed, deadline): index
+                      for index, seed in enumerate(seeds)}
+        pending = set(attempt_of)
+        while pending:
+            timeout = max(deadline - time.time(), 0) if deadline is not None else None
+            if best is None:
+                timeout = None  # Always wait for at least one result
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                logger.info("Time budget exhausted with %d attempts unfinished", len(pending))
+                break
+            for future in done:
+                result = future.result()
+                if result is None:
+                    continue  # Cancelled at the deadline
+                schedule, score = result
+                logger.debug("Attempt with seed %s scored %s", score['seed'], score)
+                candidate = (score['key'], attempt_of[future], schedule, score)
+                if best is None or candidate[:2] < best[:2]:
+                    best = candidate
+    finally:
+        stop.value = 1  # Attempts still running stop within a day
+        executor.shutdown(wait=True, cancel_futures=True)
+    return best[2], best[3]
@@ -0,0 +1,310 @@
+import bisect
+import logging
+import random
+import time
+from collections import Counter, defaultdict
+from shift_scheduler import (
+    AvailabilityIndex, group_conflict, iter_shifts, parse_days, parse_work_periods, is_weekend_day, week_key, count_between, to_day_ordinal,
+    REST_PATTERN_DAYS, WEEKEND_SHIFT_LIMIT, WEEKEND_WINDOW_DAYS
+)
+
+logger = logging.getLogger(__name__)
+
+# Objective cost of leaving a (day, job) slot empty; dominates any fairness gain
+UNFILLED_PENALTY = 1000.0
+
+class OptimizationReport:
+    def __init__(self, initial_objective):
+        self.initial_objective = initial_objective
+        self.final_objective = initial_objective
+        self.history = [(0.0, initial_objective)]  # (seconds elapsed, objective) after each improvement
+        self.moves_tried = 0
+        self.moves_accepted = 0
+
+    @property
+    def improvement(self):
+        return self.initial_objective - self.final_objective
+
+    def __repr__(self):
+        return f"OptimizationReport(initial={self.initial_objective:.2f}, final={self.final_objective:.2f}, accepted={self.moves_accepted}/{self.moves_tried})"
+
+class LocalSearch:
+    """Move, swap and fill local search over a finished schedule.
+
+    The objective is the squared deviation of every worker's shift count from their
+    percentage-based quota, plus weekend_weight times the same for weekend/holiday shifts,
+    plus UNFILLED_PENALTY per empty slot. Each move touches at most two workers, so its delta
+    is computed from their counters alone. Moves are only applied if they pass the same
+    constraints as can_work_on_date, checked against both neighbouring shifts of the worker.
+    Slots in fixed (by default the obligatory coverage shifts) are never changed.
+    """
+
+    def __init__(self, schedule, work_periods, holidays, jobs, workers, min_distance, max_shifts_per_week, weekend_weight=1.0, fixed=None):
+        periods = parse_work_periods(work_periods)
+        self.days = [day for start, end in periods for day in range(start.toordinal(), end.toordinal() + 1)]
+        self.jobs = list(jobs)
+        self.workers = {worker.identification: worker for worker in workers}
+        self.worker_ids = list(self.workers)
+        self.availability = AvailabilityIndex(workers, periods)
+        self.holidays_set = parse_days(holidays)
+        self.max_shifts_per_week = max_shifts_per_week
+        self.weekend_weight = weekend_weight
+        self.adjusted_min_distance = {worker.identification: min_distance * 100 / worker.percentage_shifts for worker in workers}
+        self.groups = {worker.identification: worker.group for worker in workers}
+        self.incompatibility = {worker.identification: worker.group_incompatibility for worker in workers if worker.group_incompatibility}
+
+        total_percentage = sum(worker.percentage_shifts for worker in workers) or 1
+        weekend_slots = sum(1 for day in self.days if self.is_weekend_or_holiday(day)) * len(self.jobs)
+        self.target = {worker.identification: len(self.days) * len(self.jobs) * worker.percentage_shifts / total_percentage for worker in workers}
+        self.weekend_target = {worker.identification: weekend_slots * worker.percentage_shifts / total_percentage for worker in workers}
+
+        self.occupancy = defaultdict(dict)
+        self.shifts = {worker_id: [] for worker_id in self.workers}
+        self.weekend_shifts = {worker_id: [] for worker_id in self.workers}  # sorted weekend/holiday shift days
+        self.count = Counter()
+        self.weekend = Counter()
+        self.weekly = defaultdict(Counter)
+        self.job_days = defaultdict(list)  # (worker id, job) -> sorted shift days
+        self.fixed = set(fixed) if fixed is not None else set()
+        for day, job, worker_id in iter_shifts(schedule):
+            if worker_id in self.workers:
+                self._add(worker_id, day, job)
+            else:
+                self.occupancy[day][job] = worker_id
+                self.fixed.add((day, job))
+        if fixed is None:
+            for worker in workers:
+                for day, job in getattr(worker, 'obligatory_coverage_shifts', {}).items():
+                    day = to_day_ordinal(day)
+                    if self.occupancy[day].get(job) == worker.identification:
+                        self.fixed.add((day, job))
+        self.unfilled = [(day, job) for day in self.days for job in self.jobs if job not in self.occupancy[day]]
+        self.objective = self.full_objective()
+
+    def is_weekend_or_holiday(self, day):
+        return is_weekend_day(day) or day in self.holidays_set
+
+    def _add(self, worker_id, day, job):
+        self.occupancy[day][job] = worker_id
+        bisect.insort(self.shifts[worker_id], day)
+        self.count[worker_id] += 1
+        if self.is_weekend_or_holiday(day):
+            self.weekend[worker_id] += 1
+            bisect.insort(self.weekend_shifts[worker_id], day)
+        self.weekly[worker_id][week_key(day)] += 1
+        bisect.insort(self.job_days[worker_id, job], day)
+
+    def _remove(self, worker_id, day, job):
+        del self.occupancy[day][job]
+        shifts = self.shifts[worker_id]
+        del shifts[bisect.bisect_left(shifts, day)]
+        self.count[worker_id] -= 1
+        if self.is_weekend_or_holiday(day):
+            self.weekend[worker_id] -= 1
+            weekend_shifts = self.weekend_shifts[worker_id]
+            del weekend_shifts[bisect.bisect_left(weekend_shifts, day)]
+        self.weekly[worker_id][week_key(day)] -= 1
+        job_days = self.job_days[worker_id, job]
+        del job_days[bisect.bisect_left(job_days, day)]
+
+    def feasible(self, worker_id, day, job, override=False):
+        # Whether worker_id can take (day, job) on top of their current shifts; override only
+        # checks group incompatibility and unavailable dates. Unlike can_work_on_date it keeps
+        # the group check, so a repair never seats incompatible groups together
+        worker = self.workers[worker_id]
+        if group_conflict(worker, self.occupancy[day].values(), self.groups, self.incompatibility):
+            return False
+        if self.availability.is_unavailable(worker_id, day):
+            return False
+        if override:
+            return True
+        if not self.availability.in_work_period(worker_id, day):
+            return False
+        shifts = self.shifts[worker_id]
+        position = bisect.bisect_left(shifts, day)
+        neighbours = [day - shifts[position - 1]] if position > 0 else []
+        if position < len(shifts):
+            neighbours.append(shifts[position] - day)
+        for days_diff in neighbours:
+            if days_diff < self.adjusted_min_distance[worker_id] or days_diff in REST_PATTERN_DAYS:
+                return False
+        # Job repetition, as the engines see it in day order: a shift the day after another,
+        # on a job worked before. Checked for this shift, for the shift on the next day, and
+        # for the first later shift of job, which stops being the first
+        job_days = self.job_days[worker_id, job]
+        if position > 0 and day - shifts[position - 1] == 1 and job_days and job_days[0] < day:
+            return False
+        if job_days and job_days[0] > day and (job_days[0] - 1 == day or self._works_on(worker_id, job_days[0] - 1)):
+            return False
+        if position < len(shifts) and shifts[position] - day == 1:
+            for next_job, other in self.occupancy[day + 1].items():
+                if other == worker_id and next_job != job and self.job_days[worker_id, next_job][0] <= day:
+                    return False
+        if self.is_weekend_or_holiday(day) and not self._weekend_window_ok(worker_id, day):
+            return False
+        return self.weekly[worker_id][week_key(day)] < self.max_shifts_per_week
+
+    def _works_on(self, worker_id, day):
+        shifts = self.shifts[worker_id]
+        position = bisect.bisect_left(shifts, day)
+        return position < len(shifts) and shifts[position] == day
+
+    def gap_ok(self, worker_id, day):
+        # After worker_id gave up their shift on day: the gap left between their shifts before
+        # and after it must not be one of REST_PATTERN_DAYS
+        shifts = self.shifts[worker_id]
+        position = bisect.bisect_left(shifts, day)
+        return not (0 < position < len(shifts) and shifts[position] - shifts[position - 1] in REST_PATTERN_DAYS)
+
+    def _weekend_window_ok(self, worker_id, day):
+        # A shift in the middle of the schedule also enters the windows of the later weekend
+        # shifts, so every window ending on day or on one of those must stay within the limit
+        weekend_shifts = self.weekend_shifts[worker_id]
+        ends = [day] + weekend_shifts[bisect.bisect_right(weekend_shifts, day):bisect.bisect_left(weekend_shifts, day + WEEKEND_WINDOW_DAYS)]
+        return all(count_between(weekend_shifts, end - WEEKEND_WINDOW_DAYS + 1, end) + 1 <= WEEKEND_SHIFT_LIMIT for end in ends)
+
+    def _delta(self, worker_id, shifts_change, weekend_change):
+        count_gap = self.count[worker_id] - self.target[worker_id]
+        weekend_gap = self.weekend[worker_id] - self.weekend_target[worker_id]
+        return (2 * count_gap * shifts_change + shifts_change ** 2) + self.weekend_weight * (2 * weekend_gap * weekend_change + weekend_change ** 2)
+
+    def full_objective(self):
+        objective = UNFILLED_PENALTY * len(self.unfilled)
+        for worker_id in self.workers:
+            objective += (self.count[worker_id] - self.target[worker_id]) ** 2
+            objective += self.weekend_weight * (self.weekend[worker_id] - self.weekend_target[worker_id]) ** 2
+        return objective
+
+    def _try_move(self, rnd, day, job, candidates=8):
+        # Hands a filled slot to the best improving, feasible worker among a random sample
+        owner = self.occupancy[day][job]
+        weekend = self.is_weekend_or_holiday(day)
+        owner_delta = self._delta(owner, -1, -weekend)
+        options = sorted((owner_delta + self._delta(worker_id, 1, weekend), worker_id) for worker_id in rnd.sample(self.worker_ids, min(candidates, len(self.worker_ids))) if worker_id != owner)
+        self._remove(owner, day, job)
+        if not self.gap_ok(owner, day):
+            options = []
+        for delta, worker_id in options:
+            if delta >= 0:
+                break
+            if self.feasible(worker_id, day, job):
+                self._add(worker_id, day, job)
+                return delta
+        self._add(owner, day, job)
+        return None
+
+    def _try_swap(self, first, second):
+        # Exchanges two shifts between their workers; only weekend balance can change
+        (day_a, job_a), (day_b, job_b) = first, second
+        worker_a, worker_b = self.occupancy[day_a][job_a], self.occupancy[day_b][job_b]
+        change = self.is_weekend_or_holiday(day_b) - self.is_weekend_or_holiday(day_a)
+        if worker_a == worker_b or change == 0:
+            return None
+        delta = self.weekend_weight * ((2 * (self.weekend[worker_a] - self.weekend_target[worker_a]) * change + 1) + (2 * (self.weekend[worker_b] - self.weekend_target[worker_b]) * -change + 1))
+        if delta >= 0:
+            return None
+        self._remove(worker_a, day_a, job_a)
+        self._remove(worker_b, day_b, job_b)
+        if self.feasible(worker_a, day_b, job_b):
+            self._add(worker_a, day_b, job_b)
+            if self.feasible(worker_b, day_a, job_a):
+                self._add(worker_b, day_a, job_a)
+                if self.gap_ok(worker_a, day_a) and self.gap_ok(worker_b, day_b):
+                    return delta
+                self._remove(worker_b, day_a, job_a)
+            self._remove(worker_a, day_b, job_b)
+        self._add(worker_a, day_a, job_a)
+        self._add(worker_b, day_b, job_b)
+        return None
+
+    def _try_fill(self, rnd, candidates=16):
+        position = rnd.randrange(len(self.unfilled))
+        day, job = self.unfilled[position]
+        options = sorted((self._delta(worker_id, 1, self.is_weekend_or_holiday(day)), worker_id) for worker_id in rnd.sample(self.worker_ids, min(candidates, len(self.worker_ids))))
+        for delta, worker_id in options:
+            if self.feasible(worker_id, day, job):
+                self._add(worker_id, day, job)
+                self.unfilled[position] = self.unfilled[-1]
+                self.unfilled.pop()
+                return delta - UNFILLED_PENALTY
+        return None
+
+    def place(self, worker_id, day, job):
+        # Fills an empty slot without checking constraints
+        self.objective += self._delta(worker_id, 1, self.is_weekend_or_holiday(day)) - UNFILLED_PENALTY
+        self._add(worker_id, day, job)
+        self.unfilled.remove((day, job))
+
+    def release(self, day, job):
+        # Empties a filled slot and returns the worker it was taken from
+        worker_id = self.occupancy[day][job]
+        self.objective += self._delta(worker_id, -1, -self.is_weekend_or_holiday(day)) + UNFILLED_PENALTY
+        self._remove(worker_id, day, job)
+        self.unfilled.append((day, job))
+        return worker_id
+
+    def fill_slot(self, day, job, override=False):
+        # Gives an empty slot to the feasible worker whose quota gains most from it, None if nobody can take it
+        weekend = self.is_weekend_or_holiday(day)
+        for _, worker_id in sorted((self._delta(worker_id, 1, weekend), worker_id) for worker_id in self.worker_ids):
+            if self.feasible(worker_id, day, job, override):
+                self.place(worker_id, day, job)
+                return worker_id
+        return None
+
+    def _random_slot(self, rnd):
+        day = rnd.choice(self.days)
+        job = rnd.choice(self.jobs)
+        if job in self.occupancy[day] and (day, job) not in self.fixed:
+            return day, job
+        return None
+
+    def run(self, time_budget=1.0, seed=None, max_iterations=None):
+        rnd = random.Random(seed)
+        report = OptimizationReport(self.objective)
+        if not self.days or not self.worker_ids:
+            return report
+        start = time.perf_counter()
+        iteration = 0
+        while max_iterations is None or iteration < max_iterations:
+            if iteration % 64 == 0 and time.perf_counter() - start >= time_budget:
+                break
+            iteration += 1
+            report.moves_tried += 1
+            roll = rnd.random()
+            delta = None
+            if self.unfilled and roll < 0.2:
+                delta = self._try_fill(rnd)
+            elif roll < 0.7:
+                slot = self._random_slot(rnd)
+                if slot:
+                    delta = self._try_move(rnd, *slot)
+            else:
+                first, second = self._random_slot(rnd), self._random_slot(rnd)
+                if first and second:
+                    delta = self._try_swap(first, second)
+            if delta is not None:
+                self.objective += delta
+                report.moves_accepted += 1
+                report.history.append((time.perf_counter() - start, self.objective))
+        self.objective = self.full_objective()
+        report.final_objective = self.objective
+        logger.debug("Local search: %s", report)
+        return report
+
+    def schedule(self):
+        schedule = {job: {} for job in self.jobs}
+        for day in sorted(self.occupancy):
+            for job, worker_id in self.occupancy[day].items():
+                schedule.setdefault(job, {})[day] = worker_id
+        return schedule
+
+def optimize_schedule(schedule, work_periods, holidays, jobs, workers, min_distance, max_shifts_per_week, time_budget=1.0, seed=None, weekend_weight=1.0, fixed=None):
+    """Improves a finished schedule by local search for up to time_budget seconds.
+
+    Returns the day-ordinal schedule and an OptimizationReport whose history lists the
+    objective after every accepted move.
+    """
+    search = LocalSearch(schedule, work_periods, holidays, jobs, workers, min_distance, max_shifts_per_week, weekend_weight, fixed)
+    report = search.run(time_budget, seed)
+    return search.schedule(), report
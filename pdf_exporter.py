@@ -1,13 +1,25 @@
 from fpdf import FPDF
-from datetime import datetime, timedelta
+from datetime import date, timedelta
 import calendar
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from shift_scheduler import iter_shifts, timed_phase
+
+try:
+    from pypdf import PdfWriter
+except ImportError:  # Without pypdf every month is rendered in this process
+    PdfWriter = None
+
+# Calendars shorter than this are rendered serially, starting worker processes costs more
+PARALLEL_MIN_MONTHS = 24
 
 class PDFCalendar(FPDF):
     def header(self):
         self.set_font('Arial', 'B', 12)
         self.cell(0, 10, 'Shift Schedule Calendar', 0, 1, 'C')
 
-    def add_month(self, year, month, schedule):
+    def add_month(self, year, month, shifts_by_day):
         self.set_font('Arial', 'B', 12)
         self.cell(0, 10, f'{calendar.month_name[month]} {year}', 0, 1, 'C')
         self.ln(10)
@@ -28,8 +40,7 @@ class PDFCalendar(FPDF):
                 if day == 0:
                     self.cell(25, 20, '', 1, 0, 'C')  # Adjusted height for content
                 else:
-                    date_str = datetime(year, month, day).strftime("%d/%m/%Y")
-                    shifts = [worker for job, dates in schedule.items() for d, worker in dates.items() if d == date_str]
+                    shifts = shifts_by_day.get(date(year, month, day).toordinal(), [])
                     cell_content = ", ".join(shifts)  # Insert commas between values
                     self.cell(25, 20, cell_content, 1, 0, 'C')  # Adjusted height for content
 
@@ -44,16 +55,61 @@ class PDFCalendar(FPDF):
                     self.cell(25, 10, day, 1, 0, 'C')
                 self.ln()
 
-def export_schedule_to_pdf(schedule, filename='shift_schedule.pdf'):
+def index_shifts(schedule):
+    # {day ordinal: worker ids in job order}, built once so each calendar cell is a lookup
+    shifts_by_day = {}
+    for day, job, worker in iter_shifts(schedule):
+        shifts_by_day.setdefault(day, []).append(worker)
+    return shifts_by_day
+
+def _render_months(months, shifts_by_day, filename):
     pdf = PDFCalendar()
-    start_date = min(datetime.strptime(date, "%d/%m/%Y") for job, dates in schedule.items() for date in dates.keys())
-    end_date = max(datetime.strptime(date, "%d/%m/%Y") for job, dates in schedule.items() for date in dates.keys())
+    for year, month in months:
+        pdf.add_page()
+        pdf.add_month(year, month, shifts_by_day)
+    pdf.output(filename)
 
-    current_date = start_date
+def export_schedule_to_pdf(schedule, filename='shift_schedule.pdf', stats=None, processes=None):
+    # processes > 1 renders month pages in a process pool when pypdf is available to merge them;
+    # defaults to one process per CPU for calendars of at least PARALLEL_MIN_MONTHS months
+    with timed_phase(stats, "export_pdf"):
+        _export_schedule_to_pdf(schedule, filename, processes)
+
+def _export_schedule_to_pdf(schedule, filename, processes=None):
+    shifts_by_day = index_shifts(schedule)
+    start_date = date.fromordinal(min(shifts_by_day))
+    end_date = date.fromordinal(max(shifts_by_day))
+
+    months = []
+    current_date = start_date.replace(day=1)
     while current_date <= end_date:
-        pdf.add_page()
-        pdf.add_month(current_date.year, current_date.month, schedule)
-        current_date += timedelta(days=32)
-        current_date = current_date.replace(day=1)
+        months.append((current_date.year, current_date.month))
+        current_date = (current_date + timedelta(days=32)).replace(day=1)
 
-    pdf.output(filename)
+    if processes is None:
+        processes = (os.cpu_count() or 1) if len(months) >= PARALLEL_MIN_MONTHS else 1
+    processes = min(processes, len(months))
+    if processes < 2 or PdfWriter is None:
+        _render_months(months, shifts_by_day, filename)
+        return
+
+    # Contiguous chunks of months, each process only gets the shifts it draws
+    size = -(-len(months) // processes)
+    chunks = [months[i:i + size] for i in range(0, len(months), size)]
+    with tempfile.TemporaryDirectory() as tmp:
+        parts = [os.path.join(tmp, f"part{i}.pdf") for i in range(len(chunks))]
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            futures = []
+            for chunk, part in zip(chunks, parts):
+                first = date(*chunk[0], 1).toordinal()
+                last_year, last_month = chunk[-1]
+                last = date(last_year, last_month, calendar.monthrange(last_year, last_month)[1]).toordinal()
+                chunk_shifts = {day: shifts for day, shifts in shifts_by_day.items() if first <= day <= last}
+                futures.append(executor.submit(_render_months, chunk, chunk_shifts, part))
+            for future in futures:
+                future.result()
+        writer = PdfWriter()
+        for part in parts:
+            writer.append(part)
+        with open(filename, 'wb') as f:
+            writer.write(f)
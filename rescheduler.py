@@ -0,0 +1,174 @@
+import bisect
+import copy
+import logging
+import math
+import time
+from collections import defaultdict, deque
+from shift_scheduler import iter_shifts, parse_days, is_weekend_day, format_day, WEEKEND_SHIFT_LIMIT, WEEKEND_WINDOW_DAYS
+from optimizer import LocalSearch
+from worker_table import WorkerTable, WorkerView
+
+logger = logging.getLogger(__name__)
+
+class RosterChange:
+    """What changed since a schedule was made.
+
+    removed_workers holds worker ids, unavailable_dates maps worker ids to their newly
+    unavailable dates and holidays lists new holidays. Dates may be "%d/%m/%Y" strings,
+    date objects or day ordinals.
+    """
+
+    def __init__(self, added_workers=None, removed_workers=None, unavailable_dates=None, holidays=None):
+        self.added_workers = list(added_workers) if added_workers else []
+        self.removed_workers = set(removed_workers) if removed_workers else set()
+        self.unavailable_dates = dict(unavailable_dates) if unavailable_dates else {}
+        self.holidays = list(holidays) if holidays else []
+
+    def apply(self, workers, holidays):
+        # Returns the new roster and holidays. Workers with newly unavailable dates are replaced
+        # by copies carrying them, so the caller's workers are left as they were; a WorkerView
+        # writes through to its table, so it is copied into a table of its own
+        roster = []
+        for worker in [worker for worker in workers if worker.identification not in self.removed_workers] + self.added_workers:
+            if worker.identification in self.unavailable_dates:
+                worker = WorkerTable.from_workers([worker])[0] if isinstance(worker, WorkerView) else copy.copy(worker)
+                worker.unavailable_dates = list(worker.unavailable_dates) + list(self.unavailable_dates[worker.identification])
+            roster.append(worker)
+        return roster, list(holidays) + self.holidays
+
+class RepairReport:
+    def __init__(self, impacted):
+        self.impacted = impacted  # (day, job) slots the change made infeasible
+        self.reassigned = {}  # (day, job) -> (previous worker id or None, new worker id or None)
+        self.unfilled = []
+        self.rest_gaps = []  # (day, job) shifts freed because the freed shift before them left a rest-pattern gap
+        self.windows_widened = 0
+        self.override_fallbacks = 0
+        self.seconds = 0.0
+
+    def __repr__(self):
+        return f"RepairReport(impacted={len(self.impacted)}, rest_gaps={len(self.rest_gaps)}, reassigned={len(self.reassigned)}, unfilled={len(self.unfilled)}, widened={self.windows_widened}, overrides={self.override_fallbacks})"
+
+def impacted_slots(schedule, holidays, change):
+    """Returns the set of (day, job) slots in schedule that change makes infeasible.
+
+    These are the shifts of removed workers, shifts on a worker's new unavailable dates and,
+    where the new holidays push a worker over the weekend/holiday limit of a window that was
+    within it before, their latest shifts on those holidays.
+    """
+    unavailable = {worker_id: parse_days(dates) for worker_id, dates in change.unavailable_dates.items()}
+    old_holidays = parse_days(holidays)
+    new_holidays = parse_days(change.holidays) - old_holidays
+    impacted = set()
+    weekend_shifts = defaultdict(list)
+    for day, job, worker_id in iter_shifts(schedule):
+        if worker_id in change.removed_workers or day in unavailable.get(worker_id, ()):
+            impacted.add((day, job))
+        elif is_weekend_day(day) or day in old_holidays or day in new_holidays:
+            weekend_shifts[worker_id].append((day, job))
+    for shifts in weekend_shifts.values():
+        # Sweeps the window over the worker's weekend/holiday shifts, dropping the latest shift
+        # on a new holiday while the window holds more than the limit and more than it used to
+        window = deque()
+        for day, job in sorted(shifts):
+            window.append((day, job))
+            while window[0][0] <= day - WEEKEND_WINDOW_DAYS:
+                window.popleft()
+            before = sum(1 for other, _ in window if other not in new_holidays or is_weekend_day(other))
+            while len(window) > max(before, WEEKEND_SHIFT_LIMIT):
+                moved = [slot for slot in window if slot[0] in new_holidays and not is_weekend_day(slot[0])]
+                if not moved:
+                    break
+                impacted.add(moved[-1])
+                window.remove(moved[-1])
+    return impacted
+
+def _release_rest_gaps(search, day, worker_id):
+    # worker_id has just lost their shift on day. While the gap that leaves before their next shift
+    # is one of REST_PATTERN_DAYS, the verifier would flag that shift, so it is freed as well
+    freed = []
+    while not search.gap_ok(worker_id, day):
+        shifts = search.shifts[worker_id]
+        day = shifts[bisect.bisect_left(shifts, day)]
+        job = next(job for job, other in search.occupancy[day].items() if other == worker_id)
+        if (day, job) in search.fixed:
+            break
+        search.release(day, job)
+        freed.append((day, job))
+    return freed
+
+def _widen(search, day, job, window):
+    # Frees the movable shifts within window days of an unfillable slot and refills them all,
+    # the stuck slot first; rolls back unless every one of them could be filled again without
+    # leaving a worker who lost a shift a rest-pattern gap
+    released = [(other_day, other_job, search.occupancy[other_day][other_job]) for other_day in range(day - window, day + window + 1) for other_job in search.jobs
+                if other_job in search.occupancy.get(other_day, ()) and (other_day, other_job) not in search.fixed]
+    for other_day, other_job, _ in released:
+        search.release(other_day, other_job)
+    filled = [search.fill_slot(day, job)]
+    if filled[0] is not None:
+        filled += [search.fill_slot(other_day, other_job) for other_day, other_job, _ in released]
+    if None not in filled and all(search.gap_ok(worker_id, other_day) for other_day, _, worker_id in released):
+        return True
+    if filled[0] is not None:
+        search.release(day, job)
+    for (other_day, other_job, _), new_worker in zip(released, filled[1:]):
+        if new_worker is not None:
+            search.release(other_day, other_job)
+    for other_day, other_job, worker_id in released:
+        search.place(worker_id, other_day, other_job)
+    return False
+
+def reschedule(schedule, work_periods, holidays, jobs, workers, min_distance, max_shifts_per_week, change, window=None, override=True):
+    """Repairs a finished schedule after a roster change without rescheduling from scratch.
+
+    Tracker state is rebuilt from the existing assignments, then only the slots the change
+    affects (see impacted_slots) and any slots left empty before are re-assigned, each to the
+    feasible worker furthest below their quota. A slot nobody can take frees the movable shifts
+    within window days of it (by default the largest adjusted min distance) and refills them
+    together. If that fails too and override is set, the slot goes to any worker who is not
+    unavailable, as schedule_shifts falls back to. Obligatory coverage shifts are kept.
+    A worker's shift after one they lose is re-assigned as well when the gap between them
+    would be one of REST_PATTERN_DAYS.
+    Returns the day-ordinal schedule and a RepairReport.
+    """
+    start = time.perf_counter()
+    impacted = impacted_slots(schedule, holidays, change)
+    workers, holidays = change.apply(workers, holidays)
+
+    kept = {job: {} for job in jobs}
+    previous = {}
+    for day, job, worker_id in iter_shifts(schedule):
+        previous[(day, job)] = worker_id
+        if (day, job) not in impacted:
+            kept.setdefault(job, {})[day] = worker_id
+
+    search = LocalSearch(kept, work_periods, holidays, jobs, workers, min_distance, max_shifts_per_week)
+    report = RepairReport(sorted(impacted))
+    for day, job in sorted(impacted):
+        if previous[(day, job)] in search.workers:
+            report.rest_gaps += _release_rest_gaps(search, day, previous[(day, job)])
+    if window is None:
+        window = math.ceil(max(search.adjusted_min_distance.values(), default=min_distance))
+
+    for day, job in sorted(search.unfilled):
+        if job in search.occupancy[day] or search.fill_slot(day, job) is not None:
+            continue
+        if window > 0 and _widen(search, day, job, window):
+            report.windows_widened += 1
+        elif override and search.fill_slot(day, job, override=True) is not None:
+            report.override_fallbacks += 1
+        else:
+            logger.warning("No available workers for job %s on %s after the roster change", job, format_day(day))
+
+    result = search.schedule()
+    for day, job, worker_id in iter_shifts(result):
+        if previous.get((day, job)) != worker_id:
+            report.reassigned[(day, job)] = (previous.get((day, job)), worker_id)
+    for slot in list(impacted) + report.rest_gaps:
+        if slot not in report.reassigned:
+            report.reassigned[slot] = (previous[slot], None)
+    report.unfilled = sorted(search.unfilled)
+    report.seconds = time.perf_counter() - start
+    logger.debug("Rescheduled: %s", report)
+    return result, report
@@ -0,0 +1,99 @@
+import csv
+import json
+from pathlib import Path
+from worker import Worker
+
+WORKER_FIELDS = ('identification', 'work_dates', 'percentage', 'group', 'incompatible_job', 'group_incompatibility', 'obligatory_coverage', 'unavailable_dates')
+ROSTER_FIELDS = ('work_periods', 'holidays', 'jobs', 'min_distance', 'max_shifts_per_week')
+LIST_FIELDS = ('work_periods', 'holidays', 'jobs', 'work_dates', 'incompatible_job', 'group_incompatibility', 'obligatory_coverage', 'unavailable_dates')
+ROSTER_SUFFIXES = ('.json', '.csv')
+
+def roster_from_dict(data):
+    """Builds schedule_shifts keyword arguments from a roster definition.
+
+    The definition has work_periods, holidays, jobs, min_distance, max_shifts_per_week and a
+    list of workers, each with the Worker constructor arguments as keys; dates are
+    "%d/%m/%Y" strings as in the GUI.
+    """
+    missing = [field for field in ROSTER_FIELDS + ('workers',) if field not in data]
+    if missing:
+        raise ValueError(f"Roster is missing {', '.join(missing)}")
+    workers = []
+    for entry in data['workers']:
+        unknown = set(entry) - set(WORKER_FIELDS)
+        if unknown or 'identification' not in entry:
+            raise ValueError(f"Invalid worker entry {entry!r}: fields must be {', '.join(WORKER_FIELDS)} and include identification")
+        workers.append(Worker(**entry))
+    roster = {field: data[field] for field in ROSTER_FIELDS}
+    roster['min_distance'] = int(roster['min_distance'])
+    roster['max_shifts_per_week'] = int(roster['max_shifts_per_week'])
+    roster['workers'] = workers
+    return roster
+
+def _split(value):
+    # List cells are comma-separated, as typed into the GUI
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+def roster_dict_from_csv(lines):
+    """Reads the CSV form of a roster definition into the dict roster_from_dict takes.
+
+    Rows naming a roster field (work_periods, jobs, ...) hold its value in the second cell.
+    The row starting with identification is the header of the worker table below it, whose
+    columns are worker fields; empty cells are left out. List values, such as jobs or a
+    worker's unavailable_dates, are comma-separated within their cell.
+    """
+    data = {}
+    header = None
+    for row in csv.reader(lines):
+        if not any(cell.strip() for cell in row):
+            continue
+        key = row[0].strip()
+        if header is not None:
+            entry = {field: cell.strip() for field, cell in zip(header, row) if cell.strip()}
+            data['workers'].append({field: _split(value) if field in LIST_FIELDS else value for field, value in entry.items()})
+        elif key == 'identification':
+            header = [cell.strip() for cell in row]
+            data['workers'] = []
+        elif key in ROSTER_FIELDS:
+            value = row[1] if len(row) > 1 else ''
+            data[key] = _split(value) if key in LIST_FIELDS else value.strip()
+        else:
+            raise ValueError(f"Unknown roster field '{key}'")
+    return data
+
+def read_roster_dict(path):
+    # The roster definition of a JSON or CSV file (by suffix), before roster_from_dict
+    with open(path, encoding='utf-8', newline='') as f:
+        if Path(path).suffix.lower() == '.csv':
+            return roster_dict_from_csv(f)
+        return json.load(f)
+
+def load_roster(path):
+    return roster_from_dict(read_roster_dict(path))
+
+def find_rosters(directory):
+    # The roster definitions in directory, sorted by name
+    return sorted(path for path in Path(directory).iterdir() if path.is_file() and path.suffix.lower() in ROSTER_SUFFIXES)
+
+def roster_to_dict(roster):
+    # Inverse of roster_from_dict for rosters built from worker.Worker objects
+    def period(value):
+        return value if isinstance(value, str) else f"{value[0].strftime('%d/%m/%Y')}-{value[1].strftime('%d/%m/%Y')}"
+    def day(value):
+        return value if isinstance(value, str) else value.strftime('%d/%m/%Y')
+    data = {field: roster[field] for field in ROSTER_FIELDS}
+    data['workers'] = [{
+        'identification': worker.identification,
+        'work_dates': [period(value) for value in worker.work_dates],
+        'percentage': worker.percentage_shifts,
+        'group': worker.group,
+        'incompatible_job': list(worker.incompatible_job),
+        'group_incompatibility': list(worker.group_incompatibility),
+        'obligatory_coverage': [day(value) for value in worker.obligatory_coverage],
+        'unavailable_dates': [day(value) for value in worker.unavailable_dates],
+    } for worker in roster['workers']]
+    return data
+
+def save_roster(roster, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(roster_to_dict(roster), f, indent=1)
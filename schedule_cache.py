@@ -0,0 +1,162 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from collections import OrderedDict
+from shift_scheduler import schedule_shifts_by_day, parse_days, parse_work_periods, iter_assignments, to_day_ordinal, ENGINE_VERSION
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'shift_scheduler')
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+def _period(value):
+    # Work periods as (first, last) day ordinals, whether given as "start-end" strings or date pairs
+    if isinstance(value, str):
+        start, end = value.split('-')
+        return [to_day_ordinal(start), to_day_ordinal(end)]
+    return [to_day_ordinal(value[0]), to_day_ordinal(value[1])]
+
+def _days(values):
+    return [to_day_ordinal(value) for value in values if not (isinstance(value, str) and not value.strip())]
+
+def cache_key(work_periods, holidays, jobs, workers, min_distance, max_shifts_per_week, previous_shifts=(), engine="greedy", seed=None):
+    """Returns a hex digest identifying a scheduling request.
+
+    Inputs are normalized first (dates to day ordinals, holidays and unavailable dates as
+    sorted sets) so equivalent requests share a key. Job and worker order are kept, they
+    decide ties. ENGINE_VERSION is part of the key.
+    """
+    normalized = {
+        'engine_version': ENGINE_VERSION,
+        'engine': engine,
+        'seed': seed,
+        'work_periods': [[start.toordinal(), end.toordinal()] for start, end in parse_work_periods(work_periods)],
+        'holidays': sorted(parse_days(holidays)),
+        'jobs': list(jobs),
+        'min_distance': min_distance,
+        'max_shifts_per_week': max_shifts_per_week,
+        'workers': [{
+            'identification': worker.identification,
+            'work_dates': [_period(value) for value in worker.work_dates],
+            'percentage_shifts': worker.percentage_shifts,
+            'group': worker.group,
+            'incompatible_job': list(worker.incompatible_job),
+            'group_incompatibility': list(worker.group_incompatibility),
+            'obligatory_coverage': _days(worker.obligatory_coverage),
+            'unavailable_dates': sorted(set(_days(worker.unavailable_dates))),
+        } for worker in workers],
+        'previous_shifts': sorted(iter_assignments(previous_shifts)),
+    }
+    return hashlib.sha256(json.dumps(normalized, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+def _copy(schedule):
+    return {job: dict(shifts) for job, shifts in schedule.items()}
+
+class ScheduleCache:
+    """Day-ordinal schedules by cache_key: an in-memory LRU in front of an optional on-disk store.
+
+    On disk every schedule is one JSON file; when the directory grows past max_bytes the least
+    recently used files (by modification time, refreshed on every hit) are deleted. With
+    directory=None only the memory tier is used.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, memory_entries=32):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.memory_entries = memory_entries
+        self.memory = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        schedule = self.memory.get(key)
+        if schedule is not None:
+            self.memory.move_to_end(key)
+        elif self.directory:
+            try:
+                with open(self._path(key), encoding='utf-8') as f:
+                    stored = json.load(f)
+                os.utime(self._path(key))
+            except (OSError, ValueError):
+                stored = None
+            if stored is not None:
+                schedule = {job: {int(day): worker_id for day, worker_id in shifts.items()} for job, shifts in stored}
+                self._remember(key, schedule)
+        if schedule is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return _copy(schedule)
+
+    def put(self, key, schedule):
+        schedule = _copy(schedule)
+        self._remember(key, schedule)
+        if not self.directory:
+            return
+        # Jobs are stored as a list of pairs to keep their order; written atomically
+        stored = [[job, {str(day): worker_id for day, worker_id in shifts.items()}] for job, shifts in schedule.items()]
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(stored, f)
+            os.replace(tmp_path, self._path(key))
+        except OSError as e:
+            logger.warning("Could not store schedule in cache: %s", e)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        self.evict()
+
+    def _remember(self, key, schedule):
+        self.memory[key] = schedule
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_entries:
+            self.memory.popitem(last=False)
+
+    def evict(self):
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith('.json'):
+                    info = entry.stat()
+                    entries.append((info.st_mtime, info.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+    def clear(self):
+        self.memory.clear()
+        if self.directory:
+            for name in os.listdir(self.directory):
+                if name.endswith('.json'):
+                    os.remove(os.path.join(self.directory, name))
+
+def cached_schedule_shifts(work_periods, holidays, jobs, workers, min_distance, max_shifts_per_week, previous_shifts=(), engine="greedy", seed=None, cache=None, progress=None, should_cancel=None):
+    """schedule_shifts_by_day through a ScheduleCache (by default one in DEFAULT_CACHE_DIR).
+
+    A hit returns a copy of the stored schedule without running the scheduler, so the
+    workers' shift quotas are not updated as they are by a full run.
+    """
+    if cache is None:
+        cache = ScheduleCache()
+    key = cache_key(work_periods, holidays, jobs, workers, min_distance, max_shifts_per_week, previous_shifts, engine, seed)
+    schedule = cache.get(key)
+    if schedule is not None:
+        logger.debug("Schedule cache hit %s", key)
+        return schedule
+    schedule = schedule_shifts_by_day(work_periods, holidays, jobs, workers, min_distance, max_shifts_per_week, previous_shifts, engine, seed=seed, progress=progress, should_cancel=should_cancel)
+    cache.put(key, schedule)
+    return schedule
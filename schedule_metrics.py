@@ -0,0 +1,164 @@
+import math
+from array import array
+from shift_scheduler import iter_shifts, parse_work_periods, parse_days, is_weekend_day
+
+def _spread(total_squares, total, count):
+    # Population standard deviation of count values from their sum and sum of squares
+    if count == 0:
+        return 0.0
+    mean = total / count
+    return math.sqrt(max(total_squares / count - mean * mean, 0.0))
+
+class ScheduleMetrics:
+    """Fairness and quality statistics of a schedule, kept up to date shift by shift.
+
+    Per worker row (as ScheduleRun.rows) flat arrays hold the shift count, weekend/holiday
+    shifts, shifts per job and per weekday, and the sums of squares of the last two, so adding
+    or removing a shift only touches its worker's entries and the running totals; score() is
+    then O(1) and can rank candidate schedules inside a search loop. The statistics are:
+
+    - coverage: filled (day, job) slots of the work periods over all of them
+    - quota_deviation: mean absolute difference between a worker's shifts and the shift_quota
+      calculate_shift_quota gives them at the start of a run
+    - weekend_imbalance: standard deviation of weekend/holiday shifts per full-time equivalent
+    - weekend_share: weekend/holiday shifts over all shifts
+    - job_spread, rotation_spread: mean over workers of the standard deviation of their shifts
+      per job and per weekday; 0 when every worker works every job and weekday alike
+    """
+
+    def __init__(self, workers, work_periods, holidays, jobs, schedule=None):
+        self.days = frozenset(day for start, end in parse_work_periods(work_periods) for day in range(start.toordinal(), end.toordinal() + 1))
+        self.holidays_set = parse_days(holidays)
+        self.jobs = list(jobs)
+        self.job_codes = {job: code for code, job in enumerate(self.jobs)}
+        self.slots = len(self.days) * len(self.jobs)
+        self.rows = {}
+        for worker in workers:
+            self.rows.setdefault(worker.identification, len(self.rows))
+        self.worker_ids = list(self.rows)
+        percentages = {worker.identification: worker.percentage_shifts for worker in workers}
+        total_percentage = sum(percentages.values()) or 1
+        self.fte = array('d', [percentages[worker_id] / 100 for worker_id in self.worker_ids])
+        self.target = array('d', [self.slots * percentages[worker_id] / total_percentage for worker_id in self.worker_ids])
+        count = len(self.rows)
+        self.shifts = array('l', [0]) * count
+        self.weekend = array('l', [0]) * count
+        self.job_count = array('l', [0]) * (count * len(self.jobs))
+        self.job_shifts = array('l', [0]) * count  # Shifts on one of jobs, the ones job_spread is over
+        self.job_squares = array('l', [0]) * count
+        self.weekday_count = array('l', [0]) * (count * 7)
+        self.weekday_squares = array('l', [0]) * count
+        self.filled = 0
+        self.total_shifts = 0
+        self.total_weekend = 0
+        self._sum_totals()
+        if schedule is not None:
+            self.load(schedule)
+
+    def _sum_totals(self):
+        self.deviation_total = 0.0
+        self.weekend_fte_total = 0.0
+        self.weekend_fte_squares = 0.0
+        self.job_spread_total = 0.0
+        self.rotation_spread_total = 0.0
+        for row in range(len(self.worker_ids)):
+            self._add_row_values(self._row_values(row), 1)
+
+    def _row_values(self, row):
+        # The per-worker terms of the running totals
+        weekend_fte = self.weekend[row] / self.fte[row]
+        return (abs(self.shifts[row] - self.target[row]), weekend_fte, weekend_fte * weekend_fte,
+                _spread(self.job_squares[row], self.job_shifts[row], len(self.jobs)), _spread(self.weekday_squares[row], self.shifts[row], 7))
+
+    def _add_row_values(self, values, sign):
+        deviation, weekend_fte, weekend_square, job_spread, rotation_spread = values
+        self.deviation_total += sign * deviation
+        self.weekend_fte_total += sign * weekend_fte
+        self.weekend_fte_squares += sign * weekend_square
+        self.job_spread_total += sign * job_spread
+        self.rotation_spread_total += sign * rotation_spread
+
+    def _count(self, row, day, job, step):
+        # Updates the counters of one shift, step 1 to add it and -1 to remove it
+        self.shifts[row] += step
+        self.total_shifts += step
+        if is_weekend_day(day) or day in self.holidays_set:
+            self.weekend[row] += step
+            self.total_weekend += step
+        code = self.job_codes.get(job)
+        if code is not None:
+            slot = row * len(self.jobs) + code
+            self.job_squares[row] += step * (2 * self.job_count[slot] + step)
+            self.job_count[slot] += step
+            self.job_shifts[row] += step
+        slot = row * 7 + (day + 6) % 7
+        self.weekday_squares[row] += step * (2 * self.weekday_count[slot] + step)
+        self.weekday_count[slot] += step
+
+    def _update(self, day, job, worker_id, step):
+        if day in self.days:
+            self.filled += step
+        row = self.rows.get(worker_id)
+        if row is None:
+            return  # Workers outside the roster only count towards coverage
+        self._add_row_values(self._row_values(row), -1)
+        self._count(row, day, job, step)
+        self._add_row_values(self._row_values(row), 1)
+
+    def add(self, day, job, worker_id):
+        self._update(day, job, worker_id, 1)
+
+    def remove(self, day, job, worker_id):
+        self._update(day, job, worker_id, -1)
+
+    def load(self, schedule):
+        # Adds every shift of schedule in one pass over the counters, then sums the totals once
+        for day, job, worker_id in iter_shifts(schedule):
+            if day in self.days:
+                self.filled += 1
+            row = self.rows.get(worker_id)
+            if row is not None:
+                self._count(row, day, job, 1)
+        self._sum_totals()
+        return self
+
+    def score(self):
+        """The statistics as a dict, with 'key' sorting better schedules first as multistart.score_schedule does."""
+        workers = len(self.worker_ids)
+        coverage = self.filled / self.slots if self.slots else 1.0
+        quota_deviation = self.deviation_total / workers if workers else 0.0
+        weekend_imbalance = _spread(self.weekend_fte_squares, self.weekend_fte_total, workers) if workers > 1 else 0.0
+        return {
+            'coverage': coverage,
+            'quota_deviation': quota_deviation,
+            'weekend_imbalance': weekend_imbalance,
+            'weekend_share': self.total_weekend / self.total_shifts if self.total_shifts else 0.0,
+            'job_spread': self.job_spread_total / workers if workers else 0.0,
+            'rotation_spread': self.rotation_spread_total / workers if workers else 0.0,
+            'filled': self.filled,
+            'slots': self.slots,
+            'key': (-coverage, quota_deviation, weekend_imbalance),
+        }
+
+    def worker_summary(self):
+        # One dict per worker in roster order: shifts against quota, weekend share and spreads
+        summary = []
+        for row, worker_id in enumerate(self.worker_ids):
+            shifts = self.shifts[row]
+            summary.append({
+                'worker': worker_id,
+                'shifts': shifts,
+                'quota': self.target[row],
+                'deviation': shifts - self.target[row],
+                'weekend': self.weekend[row],
+                'weekend_share': self.weekend[row] / shifts if shifts else 0.0,
+                'job_spread': _spread(self.job_squares[row], self.job_shifts[row], len(self.jobs)),
+                'rotation_spread': _spread(self.weekday_squares[row], shifts, 7),
+                'jobs': {job: self.job_count[row * len(self.jobs) + code] for code, job in enumerate(self.jobs)},
+            })
+        return summary
+
+def format_score(score):
+    # One-line summary of a score() dict, for the GUI summary panel
+    return (f"Coverage {score['coverage']:.1%} ({score['filled']}/{score['slots']} slots), quota deviation {score['quota_deviation']:.2f} shifts, "
+            f"weekend share {score['weekend_share']:.0%} (imbalance {score['weekend_imbalance']:.2f}), job spread {score['job_spread']:.2f}, weekday spread {score['rotation_spread']:.2f}")
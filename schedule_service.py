@@ -0,0 +1,316 @@
+"""Long-running local scheduling service.
+
+`python main.py serve` listens on 127.0.0.1:8765 (or a Unix socket with --socket) and keeps a
+pool of worker processes with the scheduler already imported, so a request only pays for
+its own run. The protocol is JSON lines, any number of requests per connection:
+
+    {"op": "schedule", "roster": {...}, "engine": "greedy", "seed": null, "previous_shifts": []}
+    {"op": "cancel", "job": 3}
+    {"op": "status"}
+
+roster is a roster definition as read by roster_io.read_roster_dict. A schedule request is
+answered with a "queued" event carrying its job id, then "started", "progress", and one of
+"done" (with the schedule keyed by "%d/%m/%Y" dates), "failed" or "cancelled", each a JSON
+line with "event" and "job". A request identical to one still queued or running (same
+schedule_cache.cache_key) joins it instead of scheduling the roster again. Closing the
+connection, or just its sending side, unsubscribes it from its jobs, and a job nobody else
+waits for is cancelled.
+"""
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import count
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+PROGRESS_INTERVAL = 0.1  # Seconds between progress events of a job
+LINE_LIMIT = 256 * 1024 * 1024  # Longest JSON line read, rosters and schedules are sent whole
+
+# Set in each pool process by _init_worker
+_progress_queue = None
+_cancel_flags = None
+
+def _init_worker(progress_queue, cancel_flags):
+    # Imports everything a run needs once per process, so requests start warm
+    global _progress_queue, _cancel_flags
+    _progress_queue = progress_queue
+    _cancel_flags = cancel_flags
+    import roster_io, shift_scheduler, matching_scheduler  # noqa: F401
+    try:
+        import vectorized_scheduler  # noqa: F401
+    except ImportError:
+        pass  # numpy is optional, engine="numpy" fails on its own
+
+def _run_job(job_id, slot, roster_data, engine, seed, previous_shifts):
+    # Runs in a pool process; progress goes through the shared queue and cancellation is read
+    # from the job's slot of the shared flags
+    from roster_io import roster_from_dict
+    from shift_scheduler import schedule_shifts_by_day, format_schedule
+    roster = roster_from_dict(roster_data)
+    last_report = [0.0]
+
+    def progress(days_done, total_days, slots_filled):
+        now = time.monotonic()
+        if days_done == total_days or now - last_report[0] >= PROGRESS_INTERVAL:
+            last_report[0] = now
+            _progress_queue.put((job_id, days_done, total_days, slots_filled))
+
+    start = time.perf_counter()
+    schedule = schedule_shifts_by_day(**roster, previous_shifts=previous_shifts, engine=engine, seed=seed, progress=progress, should_cancel=lambda: _cancel_flags[slot] == 1)
+    return format_schedule(schedule), time.perf_counter() - start
+
+def _request_key(request):
+    # Parses a schedule request's roster and hashes it with the run options; CPU-bound for big
+    # rosters, so submit runs it in a thread
+    from roster_io import roster_from_dict
+    from schedule_cache import cache_key
+    roster = roster_from_dict(request['roster'])
+    previous_shifts = [tuple(shift) for shift in request.get('previous_shifts', ())]
+    return cache_key(**roster, previous_shifts=previous_shifts, engine=request.get('engine', 'greedy'), seed=request.get('seed')), previous_shifts
+
+class _Job:
+    def __init__(self, job_id, key, request):
+        self.id = job_id
+        self.key = key
+        self.request = request
+        self.subscribers = set()
+        self.state = 'queued'
+        self.slot = None
+        self.task = None
+
+class _Connection:
+    def __init__(self, writer):
+        self.writer = writer
+        self.lock = asyncio.Lock()
+        self.closed = False
+
+    async def send(self, message):
+        if self.closed or self.writer.is_closing():
+            self.closed = True
+            return
+        async with self.lock:
+            try:
+                self.writer.write(json.dumps(message).encode('utf-8') + b'\n')
+                await self.writer.drain()
+            except (ConnectionError, RuntimeError):
+                self.closed = True
+
+class ScheduleService:
+    """Queues roster jobs onto a pool of warm worker processes and streams their events back.
+
+    At most max_jobs jobs run at once (by default one per pool process), the rest wait in
+    submission order. Cancelling a running job sets its flag in shared memory, which the run's
+    should_cancel reads before each day. Identical requests in flight share one job; a job is
+    also cancelled when every connection that asked for it has gone.
+    """
+
+    def __init__(self, processes=None, max_jobs=None):
+        self.processes = processes or os.cpu_count() or 1
+        self.max_jobs = max_jobs or self.processes
+        self.progress_queue = multiprocessing.Queue()
+        self.cancel_flags = multiprocessing.Array('b', self.max_jobs, lock=False)
+        self.free_slots = list(range(self.max_jobs))
+        self.slots_available = None
+        self.pool = None
+        self.jobs = {}
+        self.in_flight = {}  # cache_key -> job
+        self.job_ids = count(1)
+        self.pump = None
+
+    def _new_pool(self):
+        return ProcessPoolExecutor(max_workers=self.processes, initializer=_init_worker, initargs=(self.progress_queue, self.cancel_flags))
+
+    async def start(self):
+        # Starts every pool process now, so the first requests do not wait for imports
+        self.slots_available = asyncio.Semaphore(self.max_jobs)
+        self.pool = self._new_pool()
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self.pool, time.sleep, 0.1) for _ in range(self.processes)))
+        self.pump = asyncio.create_task(self._pump_progress())
+        logger.info("Scheduling service ready with %d processes, %d concurrent jobs", self.processes, self.max_jobs)
+
+    async def close(self):
+        for job in list(self.jobs.values()):
+            self.cancel(job.id)
+        self.progress_queue.put(None)
+        if self.pump is not None:
+            await self.pump
+        if self.pool is not None:
+            self.pool.shutdown(wait=True, cancel_futures=True)
+
+    async def _pump_progress(self):
+        # Relays the pool's progress reports to the subscribers of each job
+        loop = asyncio.get_running_loop()
+        while True:
+            report = await loop.run_in_executor(None, self.progress_queue.get)
+            if report is None:
+                return
+            job_id, days_done, total_days, slots_filled = report
+            job = self.jobs.get(job_id)
+            if job is not None:
+                await self._broadcast(job, {'event': 'progress', 'days_done': days_done, 'total_days': total_days, 'slots_filled': slots_filled})
+
+    async def _broadcast(self, job, message):
+        message = dict(message, job=job.id)
+        await asyncio.gather(*(connection.send(message) for connection in list(job.subscribers)))
+        self._drop_closed(job)
+
+    def _drop_closed(self, job, connection=None):
+        # Unsubscribes connection and every connection that has gone; cancels the job once nobody waits for it
+        job.subscribers = {other for other in job.subscribers if other is not connection and not other.closed}
+        if not job.subscribers and job.state in ('queued', 'running'):
+            logger.info("Cancelling job %d, nobody is waiting for it", job.id)
+            self.cancel(job.id)
+
+    async def submit(self, request, connection):
+        """Queues a schedule request for connection, or subscribes it to an identical job in flight."""
+        key, previous_shifts = await asyncio.get_running_loop().run_in_executor(None, _request_key, request)
+        engine = request.get('engine', 'greedy')
+        seed = request.get('seed')
+        job = self.in_flight.get(key)
+        duplicate = job is not None
+        if job is None:
+            job = _Job(next(self.job_ids), key, (request['roster'], engine, seed, previous_shifts))
+            self.jobs[job.id] = job
+            self.in_flight[key] = job
+            job.task = asyncio.create_task(self._run(job))
+        job.subscribers.add(connection)
+        return job, duplicate
+
+    async def _run(self, job):
+        loop = asyncio.get_running_loop()
+        try:
+            async with self.slots_available:
+                job.slot = self.free_slots.pop()
+                self.cancel_flags[job.slot] = 0
+                job.state = 'running'
+                await self._broadcast(job, {'event': 'started'})
+                try:
+                    schedule, seconds = await loop.run_in_executor(self.pool, _run_job, job.id, job.slot, *job.request)
+                finally:
+                    self.free_slots.append(job.slot)
+            job.state = 'done'
+            await self._broadcast(job, {'event': 'done', 'schedule': schedule, 'seconds': seconds})
+        except asyncio.CancelledError:
+            job.state = 'cancelled'  # Still queued when cancelled
+            await self._broadcast(job, {'event': 'cancelled'})
+        except Exception as e:
+            from shift_scheduler import SchedulingCancelled
+            if isinstance(e, SchedulingCancelled):
+                job.state = 'cancelled'
+                await self._broadcast(job, {'event': 'cancelled'})
+            else:
+                job.state = 'failed'
+                logger.error("Job %d failed: %s", job.id, e)
+                await self._broadcast(job, {'event': 'failed', 'error': str(e) or type(e).__name__})
+                if isinstance(e, BrokenProcessPool):
+                    logger.warning("Worker process died, starting a new pool")
+                    self.pool = self._new_pool()
+        finally:
+            del self.jobs[job.id]
+            if self.in_flight.get(job.key) is job:
+                del self.in_flight[job.key]
+
+    def cancel(self, job_id):
+        # Returns False for unknown or finished jobs
+        job = self.jobs.get(job_id)
+        if job is None:
+            return False
+        if self.in_flight.get(job.key) is job:
+            del self.in_flight[job.key]  # New identical requests start over
+        if job.state == 'queued':
+            job.task.cancel()
+        elif job.state == 'running':
+            self.cancel_flags[job.slot] = 1
+        return True
+
+    def status(self):
+        return {
+            'event': 'status',
+            'processes': self.processes,
+            'max_jobs': self.max_jobs,
+            'jobs': [{'job': job.id, 'state': job.state, 'subscribers': len(job.subscribers)} for job in self.jobs.values()],
+        }
+
+    async def handle_connection(self, reader, writer):
+        connection = _Connection(writer)
+        subscribed = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                try:
+                    request = json.loads(line)
+                    op = request.get('op')
+                    if op == 'schedule':
+                        job, duplicate = await self.submit(request, connection)
+                        subscribed.add(job)
+                        await connection.send({'event': 'queued', 'job': job.id, 'duplicate': duplicate})
+                    elif op == 'cancel':
+                        if self.cancel(request.get('job')):
+                            await connection.send({'event': 'cancelling', 'job': request['job']})
+                        else:
+                            await connection.send({'event': 'error', 'job': request.get('job'), 'error': 'unknown or finished job'})
+                    elif op == 'status':
+                        await connection.send(self.status())
+                    else:
+                        await connection.send({'event': 'error', 'error': f"unknown op {op!r}"})
+                except (ValueError, KeyError, TypeError, AttributeError) as e:
+                    await connection.send({'event': 'error', 'error': str(e)})
+        except ConnectionError:
+            pass
+        finally:
+            connection.closed = True
+            for job in subscribed:
+                self._drop_closed(job, connection)
+            writer.close()
+
+async def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, path=None, processes=None, max_jobs=None):
+    """Runs a ScheduleService on host:port, or on the Unix socket path, until cancelled."""
+    service = ScheduleService(processes, max_jobs)
+    await service.start()
+    if path:
+        server = await asyncio.start_unix_server(service.handle_connection, path=path, limit=LINE_LIMIT)
+    else:
+        server = await asyncio.start_server(service.handle_connection, host, port, limit=LINE_LIMIT)
+    logger.info("Listening on %s", path or f"{host}:{port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.close()
+
+async def request_schedule(roster_data, engine='greedy', seed=None, previous_shifts=(), host=DEFAULT_HOST, port=DEFAULT_PORT, path=None, on_event=None):
+    """Client side: sends one schedule request and returns its last event ("done", "failed" or "cancelled").
+
+    on_event, if given, is called with every event received before that.
+    """
+    if path:
+        reader, writer = await asyncio.open_unix_connection(path, limit=LINE_LIMIT)
+    else:
+        reader, writer = await asyncio.open_connection(host, port, limit=LINE_LIMIT)
+    try:
+        request = {'op': 'schedule', 'roster': roster_data, 'engine': engine, 'seed': seed, 'previous_shifts': [list(shift) for shift in previous_shifts]}
+        writer.write(json.dumps(request).encode('utf-8') + b'\n')
+        await writer.drain()
+        while True:
+            line = await reader.readline()
+            if not line:
+                raise ConnectionError("Scheduling service closed the connection")
+            event = json.loads(line)
+            if event['event'] in ('done', 'failed', 'cancelled', 'error'):
+                return event
+            if on_event is not None:
+                on_event(event)
+    finally:
+        writer.close()
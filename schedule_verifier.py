@@ -0,0 +1,218 @@
+import logging
+from collections import Counter
+import numpy as np
+from shift_scheduler import (
+    AvailabilityIndex, format_day, iter_assignments, parse_days, parse_work_periods, GROUP_INCOMPATIBILITY, UNAVAILABLE, OUTSIDE_WORK_PERIOD,
+    MIN_DISTANCE, REST_PATTERN, WEEKEND_LIMIT, WEEKLY_LIMIT, JOB_REPETITION, REST_PATTERN_DAYS, WEEKEND_SHIFT_LIMIT, WEEKEND_WINDOW_DAYS
+)
+
+logger = logging.getLogger(__name__)
+
+UNKNOWN_WORKER = "unknown_worker"
+
+class Violation:
+    """One shift breaking one rule; rule is one of the rejection reasons of shift_scheduler.
+
+    related is the earlier shift day for min_distance, 7_14_21_28_days and job_repetition, the
+    shift count for weekly_limit and weekend_limit, and the other worker for group_incompatibility.
+    """
+    __slots__ = ('rule', 'day', 'job', 'worker_id', 'related')
+
+    def __init__(self, rule, day, job, worker_id, related=None):
+        self.rule = rule
+        self.day = day
+        self.job = job
+        self.worker_id = worker_id
+        self.related = related
+
+    def __repr__(self):
+        return f"Violation({self.rule!r}, {format_day(self.day)}, {self.job!r}, {self.worker_id!r}, {self.related!r})"
+
+    def __str__(self):
+        text = f"{format_day(self.day)} {self.job}: worker {self.worker_id} breaks {self.rule}"
+        if self.rule in (MIN_DISTANCE, REST_PATTERN, JOB_REPETITION):
+            text += f" (previous shift on {format_day(self.related)})"
+        elif self.rule in (WEEKLY_LIMIT, WEEKEND_LIMIT):
+            text += f" ({self.related} shifts)"
+        elif self.rule == GROUP_INCOMPATIBILITY:
+            text += f" (with worker {self.related})"
+        return text
+
+def _group_starts(change):
+    # Index of the first element of each element's run, for a boolean "starts a new run" mask
+    starts = np.flatnonzero(change)
+    return starts[np.cumsum(change) - 1]
+
+def _two_lowest(days, groups, rows, shape):
+    # The lowest and second lowest row per (day, group) cell, -1 where there are fewer
+    first = np.full(shape, -1, dtype=np.int64)
+    second = np.full(shape, -1, dtype=np.int64)
+    order = np.lexsort((rows, groups, days))
+    days, groups, rows = days[order], groups[order], rows[order]
+    start = np.ones(len(days), dtype=bool)
+    start[1:] = (days[1:] != days[:-1]) | (groups[1:] != groups[:-1])
+    follows = np.zeros(len(days), dtype=bool)
+    follows[1:] = ~start[1:] & start[:-1]
+    first[days[start], groups[start]] = rows[start]
+    second[days[follows], groups[follows]] = rows[follows]
+    return first, second
+
+def verify_schedule(schedule, work_periods, holidays, workers, min_distance, max_shifts_per_week, previous_shifts=()):
+    """Checks a complete schedule against the rules of can_work_on_date in one pass.
+
+    schedule is a {job: {day: worker id}} schedule or an iterable of (day, job, worker id)
+    shifts, as for iter_assignments, e.g. one read back with import_schedule_from_csv. The
+    shifts are sorted per worker into numpy arrays, so the distance, rest pattern and job
+    repetition checks are differences between neighbouring shifts and the weekly and
+    weekend/holiday caps are counts over sorted keys. A check fails for the later shift of a
+    pair, and for the shifts beyond the cap in a week or WEEKEND_WINDOW_DAYS window.
+
+    Group incompatibility holds both ways, as in shift_scheduler.group_conflict: a shift breaks
+    it when another worker that day is of a group its worker lists, or lists its worker's group.
+    Obligatory coverage shifts are placed with override, so only their unavailable dates are
+    checked; previous_shifts count towards the limits of the schedule but are not reported.
+    Returns the Violations sorted by day, job and rule.
+    """
+    rows = {}
+    for worker in workers:
+        rows.setdefault(worker.identification, len(rows))
+    worker_by_row = list({worker.identification: worker for worker in workers}.values())
+    violations = []
+    entries = []
+    for day, job, worker_id in iter_assignments(schedule):
+        if worker_id not in rows:
+            violations.append(Violation(UNKNOWN_WORKER, day, job, worker_id))
+            continue
+        entries.append((day, job, rows[worker_id], False))
+    entries += [(day, job, rows[worker_id], True) for day, job, worker_id in iter_assignments(previous_shifts) if worker_id in rows]
+    if not entries:
+        return violations
+
+    job_names = list(dict.fromkeys(job for _, job, _, _ in entries))
+    job_codes = {job: code for code, job in enumerate(job_names)}
+    day = np.fromiter((entry[0] for entry in entries), dtype=np.int64, count=len(entries))
+    job = np.fromiter((job_codes[entry[1]] for entry in entries), dtype=np.int64, count=len(entries))
+    row = np.fromiter((entry[2] for entry in entries), dtype=np.int64, count=len(entries))
+    context = np.fromiter((entry[3] for entry in entries), dtype=bool, count=len(entries))
+    order = np.lexsort((day, row))
+    day, job, row, context = day[order], job[order], row[order], context[order]
+
+    base = int(day.min())
+    stride = int(day.max()) - base + WEEKEND_WINDOW_DAYS + 1
+    key = row * stride + (day - base)  # Sorted: worker-major day keys
+    def day_keys(days_per_row):
+        keys = [row_number * stride + (value - base) for row_number, days in enumerate(days_per_row) for value in days]
+        return np.fromiter(keys, dtype=np.int64, count=len(keys))
+
+    obligatory = np.isin(key, day_keys(parse_days(worker.obligatory_coverage) for worker in worker_by_row))
+    checked = ~context & ~obligatory
+    flagged = {}  # rule -> (positions, related values)
+
+    flagged[UNAVAILABLE] = (np.flatnonzero(~context & np.isin(key, day_keys(parse_days(worker.unavailable_dates) for worker in worker_by_row))), None)
+
+    # Working periods: workers with the same periods share one row of the pattern matrix
+    availability = AvailabilityIndex(worker_by_row, parse_work_periods(work_periods))
+    patterns = {}
+    pattern_of_row = np.array([patterns.setdefault(id(availability.working[worker.identification]), len(patterns)) for worker in worker_by_row], dtype=np.int64)
+    shared = {id(working): working for working in availability.working.values()}
+    span = len(next(iter(shared.values()))) if shared else 0
+    matrix = np.zeros((len(patterns), span + 1), dtype=bool)  # The last column stands for days outside every period
+    for working_id, pattern in patterns.items():
+        matrix[pattern, :span] = np.frombuffer(bytes(shared[working_id]), dtype=np.uint8).astype(bool)
+    offset = day - availability.first_day
+    offset = np.where((offset >= 0) & (offset < span), offset, span)
+    flagged[OUTSIDE_WORK_PERIOD] = (np.flatnonzero(checked & ~matrix[pattern_of_row[row], offset]), None)
+
+    # Neighbouring shifts of the same worker
+    same_worker = np.zeros(len(day), dtype=bool)
+    same_worker[1:] = row[1:] == row[:-1]
+    previous_day = np.empty_like(day)
+    previous_day[0] = day[0]
+    previous_day[1:] = day[:-1]
+    diff = day - previous_day
+    adjusted = np.array([min_distance * 100 / worker.percentage_shifts for worker in worker_by_row])
+    pair = checked & same_worker
+    flagged[MIN_DISTANCE] = (np.flatnonzero(pair & (diff < adjusted[row])), previous_day)
+    flagged[REST_PATTERN] = (np.flatnonzero(pair & np.isin(diff, list(REST_PATTERN_DAYS))), previous_day)
+    # Job repetition: the day after a shift, on a job the worker has worked before
+    by_job = np.lexsort((day, job, row))
+    first_of_job = np.ones(len(day), dtype=bool)
+    first_of_job[by_job[1:]] = (row[by_job[1:]] != row[by_job[:-1]]) | (job[by_job[1:]] != job[by_job[:-1]])
+    flagged[JOB_REPETITION] = (np.flatnonzero(pair & (diff == 1) & ~first_of_job), previous_day)
+
+    # Weekly cap: within each worker's week, the checked shifts are ranked last so the ones
+    # beyond max_shifts_per_week are those reported
+    week = (day - 1) // 7
+    by_week = np.lexsort((day, checked, week, row))
+    change = np.ones(len(day), dtype=bool)
+    change[1:] = (row[by_week[1:]] != row[by_week[:-1]]) | (week[by_week[1:]] != week[by_week[:-1]])
+    rank = np.arange(len(day)) - _group_starts(change)
+    ends = np.append(np.flatnonzero(change)[1:], len(day))
+    size = (ends - np.flatnonzero(change))[np.cumsum(change) - 1]
+    over = by_week[checked[by_week] & (rank >= max_shifts_per_week)]
+    week_size = np.empty_like(size)
+    week_size[by_week] = size
+    flagged[WEEKLY_LIMIT] = (over, week_size)
+
+    # Weekend/holiday cap over the WEEKEND_WINDOW_DAYS days ending on each such shift
+    weekend = ((day + 6) % 7 >= 4) | np.isin(day, np.fromiter(parse_days(holidays), dtype=np.int64))
+    weekend_positions = np.flatnonzero(weekend)
+    weekend_keys = key[weekend_positions]
+    in_window = np.searchsorted(weekend_keys, weekend_keys, side='right') - np.searchsorted(weekend_keys, weekend_keys - WEEKEND_WINDOW_DAYS + 1, side='left')
+    window_count = np.zeros(len(day), dtype=np.int64)
+    window_count[weekend_positions] = in_window
+    flagged[WEEKEND_LIMIT] = (np.flatnonzero(checked & (window_count > WEEKEND_SHIFT_LIMIT)), window_count)
+
+    # Group incompatibility: per-day counts of each group against each worker's incompatible
+    # groups, and per-day counts of the workers listing each group against each worker's group
+    group_names = list(dict.fromkeys(worker.group for worker in worker_by_row))
+    group_codes = {group: code for code, group in enumerate(group_names)}
+    group_of_row = np.array([group_codes[worker.group] for worker in worker_by_row], dtype=np.int64)
+    incompatible = np.zeros((len(worker_by_row), len(group_names)), dtype=bool)
+    for row_number, worker in enumerate(worker_by_row):
+        for group in worker.group_incompatibility:
+            if group in group_codes:
+                incompatible[row_number, group_codes[group]] = True
+    conflicts = np.zeros(0, dtype=np.int64)
+    if incompatible.any():
+        candidates = np.flatnonzero(checked)
+        working = np.unique(key[~context])  # Once per worker and day, however many jobs
+        per_day = np.zeros((stride, len(group_names)), dtype=np.int64)
+        np.add.at(per_day, (working % stride, group_of_row[working // stride]), 1)
+        listing = np.zeros((stride, len(group_names)), dtype=np.int64)
+        np.add.at(listing, working % stride, incompatible[working // stride].astype(np.int64))
+        own_group = group_of_row[row[candidates]]
+        others = per_day[day[candidates] - base]
+        others[np.arange(len(candidates)), own_group] -= 1  # Not the worker themselves
+        listed = listing[day[candidates] - base, own_group] - incompatible[row[candidates], own_group]
+        conflicts = candidates[(incompatible[row[candidates]] & (others > 0)).any(axis=1) | (listed > 0)]
+
+    worker_ids = [worker.identification for worker in worker_by_row]
+    for rule, (positions, related) in flagged.items():
+        for position in positions.tolist():
+            violations.append(Violation(rule, int(day[position]), job_names[job[position]], worker_ids[row[position]], None if related is None else int(related[position])))
+    if len(conflicts):
+        # Name the lowest row that day in conflict with the worker: of each group they list,
+        # and among the workers listing their group, the lowest row that is not their own
+        conflict_day, conflict_row = day[conflicts] - base, row[conflicts]
+        conflict_group = group_of_row[conflict_row]
+        working_day, working_row = working % stride, working // stride
+        first, second = _two_lowest(working_day, group_of_row[working_row], working_row, per_day.shape)
+        listed_by = first[conflict_day]
+        listed_by = np.where(listed_by != conflict_row[:, None], listed_by, second[conflict_day])
+        listed_by = np.where(incompatible[conflict_row] & (listed_by >= 0), listed_by, len(worker_by_row)).min(axis=1)
+        entry, listed_group = np.nonzero(incompatible[working_row])
+        first, second = _two_lowest(working_day[entry], listed_group, working_row[entry], per_day.shape)
+        lister = first[conflict_day, conflict_group]
+        lister = np.where(lister != conflict_row, lister, second[conflict_day, conflict_group])
+        lister = np.where(lister >= 0, lister, len(worker_by_row))
+        for position, other in zip(conflicts.tolist(), np.minimum(listed_by, lister).tolist()):
+            violations.append(Violation(GROUP_INCOMPATIBILITY, int(day[position]), job_names[job[position]], worker_ids[row[position]], worker_ids[other]))
+    violations.sort(key=lambda violation: (violation.day, str(violation.job), violation.rule))
+    if violations:
+        logger.info("Schedule breaks %d rules: %s", len(violations), dict(count_violations(violations)))
+    return violations
+
+def count_violations(violations):
+    # Number of violations per rule
+    return Counter(violation.rule for violation in violations)
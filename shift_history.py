@@ -0,0 +1,185 @@
+import json
+import logging
+import math
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from shift_scheduler import iter_assignments, parse_work_periods, format_day, REST_PATTERN_DAYS, WEEKEND_WINDOW_DAYS
+
+logger = logging.getLogger(__name__)
+
+BLOCK_MAGIC = b'SHB1'
+BLOCK_HEADER = struct.Struct('<4sIii')  # magic, record count, first day, last day
+DAY = struct.Struct('<i')
+# Column item sizes: day ordinal (int32), job code (uint16), worker code (uint32)
+COLUMNS = (('i', 4), ('H', 2), ('I', 4))
+RECORD_SIZE = sum(size for _, size in COLUMNS)
+
+def history_window(min_distance, workers):
+    # Days of history the feasibility checks can look back on: the longest adjusted min
+    # distance, the 7/14/21/28-day rule, the weekly cap and the weekend window
+    longest_distance = max((min_distance * 100 / worker.percentage_shifts for worker in workers), default=min_distance)
+    return max(math.ceil(longest_distance), max(REST_PATTERN_DAYS), WEEKEND_WINDOW_DAYS, 7)
+
+def _column(data, typecode):
+    column = array(typecode)
+    column.frombytes(data)
+    if sys.byteorder == 'big':
+        column.byteswap()  # Stored little-endian
+    return column
+
+def _column_bytes(values, typecode):
+    column = array(typecode, values)
+    if sys.byteorder == 'big':
+        column.byteswap()
+    return column.tobytes()
+
+class ShiftHistory:
+    """Append-only binary history of (day ordinal, job, worker id) shifts, read through mmap.
+
+    The file is a sequence of blocks, one per append, in day order. Each block has a
+    BLOCK_HEADER followed by its day, job code and worker code columns, days sorted, so a
+    range of days is found by binary search on the day column and only those bytes are
+    read. Job and worker ids are coded through the JSON names file next to it (path + '.names').
+    Appending shifts from a day the history already holds replaces everything from that day on,
+    so a month can be rescheduled and recorded again.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.names_path = path + '.names'
+        self.jobs = []
+        self.workers = []
+        if os.path.exists(self.names_path):
+            with open(self.names_path, encoding='utf-8') as f:
+                names = json.load(f)
+            self.jobs = names['jobs']
+            self.workers = names['workers']
+        self.job_codes = {job: code for code, job in enumerate(self.jobs)}
+        self.worker_codes = {worker_id: code for code, worker_id in enumerate(self.workers)}
+
+    def _blocks(self, data):
+        # Yields (offset, count, first day, last day) of every block in the mapped file
+        offset = 0
+        while offset + BLOCK_HEADER.size <= len(data):
+            magic, count, first_day, last_day = BLOCK_HEADER.unpack_from(data, offset)
+            if magic != BLOCK_MAGIC or offset + BLOCK_HEADER.size + count * RECORD_SIZE > len(data):
+                logger.error("Shift history %s is damaged after %d bytes, ignoring the rest", self.path, offset)
+                return
+            yield offset, count, first_day, last_day
+            offset += BLOCK_HEADER.size + count * RECORD_SIZE
+
+    @staticmethod
+    def _first_at_or_after(data, offset, count, day):
+        # Binary search over a block's day column
+        low, high = 0, count
+        start = offset + BLOCK_HEADER.size
+        while low < high:
+            middle = (low + high) // 2
+            if DAY.unpack_from(data, start + middle * DAY.size)[0] < day:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _read_block(self, data, offset, count, start, end):
+        # Records start:end of a block as (day, job code, worker code) columns
+        columns = []
+        position = offset + BLOCK_HEADER.size
+        for typecode, size in COLUMNS:
+            columns.append(_column(data[position + start * size:position + end * size], typecode))
+            position += count * size
+        return columns
+
+    def _mapped(self):
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            return None
+        with open(self.path, 'rb') as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def read(self, start_day=None, end_day=None):
+        """Returns the recorded shifts with start_day <= day < end_day as (day, job, worker id) triples."""
+        data = self._mapped()
+        if data is None:
+            return []
+        shifts = []
+        with data:
+            for offset, count, first_day, last_day in self._blocks(data):
+                if (start_day is not None and last_day < start_day) or (end_day is not None and first_day >= end_day):
+                    continue
+                start = self._first_at_or_after(data, offset, count, start_day) if start_day is not None else 0
+                end = self._first_at_or_after(data, offset, count, end_day) if end_day is not None else count
+                days, jobs, workers = self._read_block(data, offset, count, start, end)
+                shifts.extend((day, self.jobs[job], self.workers[worker]) for day, job, worker in zip(days, jobs, workers))
+        return shifts
+
+    def tail(self, before_day, days):
+        # The shifts of the days days before before_day
+        return self.read(before_day - days, before_day)
+
+    def previous_shifts(self, work_periods, min_distance, workers):
+        # The history a run over work_periods needs, as schedule_shifts previous_shifts
+        periods = parse_work_periods(work_periods)
+        if not periods:
+            return []
+        first_day = min(start.toordinal() for start, _ in periods)
+        return self.tail(first_day, history_window(min_distance, workers))
+
+    def __len__(self):
+        data = self._mapped()
+        if data is None:
+            return 0
+        with data:
+            return sum(count for _, count, _, _ in self._blocks(data))
+
+    def _save_names(self):
+        directory = os.path.dirname(os.path.abspath(self.names_path))
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({'jobs': self.jobs, 'workers': self.workers}, f)
+        os.replace(temp_path, self.names_path)
+
+    def _code(self, codes, names, value):
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(names)
+            names.append(value)
+        return code
+
+    def append(self, shifts):
+        """Records a schedule (or (day, job, worker id) triples), replacing any history from its first day on."""
+        records = sorted((day, self._code(self.job_codes, self.jobs, job), self._code(self.worker_codes, self.workers, worker_id)) for day, job, worker_id in iter_assignments(shifts))
+        if not records:
+            return 0
+        self._save_names()  # Before the block, so every stored code has a name
+        first_day = records[0][0]
+        kept = []
+        truncate_at = 0  # End of the last block entirely before first_day
+        data = self._mapped()
+        if data is not None:
+            with data:
+                for offset, count, block_first, block_last in self._blocks(data):
+                    if block_last >= first_day:
+                        keep = self._first_at_or_after(data, offset, count, first_day)
+                        kept = list(zip(*self._read_block(data, offset, count, 0, keep)))
+                        break
+                    truncate_at = offset + BLOCK_HEADER.size + count * RECORD_SIZE
+        with open(self.path, 'r+b' if os.path.exists(self.path) else 'wb') as f:
+            if truncate_at < os.path.getsize(self.path):
+                logger.info("Replacing the shift history of %s from %s on", self.path, format_day(first_day))
+            f.truncate(truncate_at)
+            f.seek(truncate_at)
+            for block in (kept, records):
+                if block:
+                    f.write(self._block_bytes(block))
+        return len(records)
+
+    @staticmethod
+    def _block_bytes(records):
+        parts = [BLOCK_HEADER.pack(BLOCK_MAGIC, len(records), records[0][0], records[-1][0])]
+        for (typecode, _), values in zip(COLUMNS, zip(*records)):
+            parts.append(_column_bytes(values, typecode))
+        return b''.join(parts)
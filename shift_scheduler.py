@@ -1,13 +1,43 @@
 import logging
-logging.basicConfig(level=logging.DEBUG)
 # Existing imports
-from datetime import timedelta, datetime
-from collections import defaultdict
+from datetime import timedelta, datetime, date
+from collections import defaultdict, deque, Counter
+from contextlib import contextmanager, nullcontext
+import heapq
 import csv
-
-logging.basicConfig(level=logging.DEBUG)
+import random
+import time
+from array import array
+from bisect import bisect_left, bisect_right, insort
+
+logger = logging.getLogger(__name__)
+
+# Rejection reasons reported by rejection_reason and counted in SchedulerStats.rejections
+GROUP_INCOMPATIBILITY = "group_incompatibility"
+UNAVAILABLE = "unavailable"
+OUTSIDE_WORK_PERIOD = "outside_work_period"
+MIN_DISTANCE = "min_distance"
+REST_PATTERN = "7_14_21_28_days"
+WEEKEND_LIMIT = "weekend_limit"
+WEEKLY_LIMIT = "weekly_limit"
+JOB_REPETITION = "job_repetition"
+
+# Days since the last shift that are never allowed, and the weekend/holiday shift cap within
+# any WEEKEND_WINDOW_DAYS days ending on the shift
+REST_PATTERN_DAYS = frozenset({7, 14, 21, 28})
+WEEKEND_SHIFT_LIMIT = 4
+WEEKEND_WINDOW_DAYS = 28
+
+# Bump whenever a change makes the engines produce different schedules, it invalidates schedule_cache
+ENGINE_VERSION = 3
+
+# Tracker value of a worker without shifts yet (ScheduleRun.last_day and the recent shift rings)
+NO_SHIFT = -1
 
 class Worker:
+    __slots__ = ('identification', 'work_dates', 'percentage_shifts', 'group', 'incompatible_job', 'group_incompatibility', 'obligatory_coverage',
+                 'obligatory_coverage_shifts', 'unavailable_dates', 'shift_quota', 'weekly_shift_quota')
+
     def __init__(self, identification, work_dates=None, percentage=100.0, group='1', incompatible_job=None, group_incompatibility=None, obligatory_coverage=None, unavailable_dates=None):
         self.identification = identification
         self.work_dates = work_dates if work_dates else []
@@ -16,7 +46,10 @@ class Worker:
         self.incompatible_job = incompatible_job if incompatible_job else []
         self.group_incompatibility = group_incompatibility if group_incompatibility else []
         self.obligatory_coverage = obligatory_coverage if obligatory_coverage else []
+        self.obligatory_coverage_shifts = {}
         self.unavailable_dates = unavailable_dates if unavailable_dates else []
+        self.shift_quota = 0
+        self.weekly_shift_quota = 0
 
 def calculate_shift_quota(workers, total_days, jobs_per_day):
     total_percentage = sum(worker.percentage_shifts for worker in workers)
@@ -39,98 +72,98 @@ def is_holiday(date_str, holidays_set):
     else:
         return False
 
-def can_work_on_date(worker, date, last_shift_dates, weekend_tracker, holidays_set, weekly_tracker, job, job_count, min_distance, max_shifts_per_week, override=False, schedule=None, workers=None):
-    if isinstance(date, str) and date:  # Check if date is a non-empty string
-        date = datetime.strptime(date.strip(), "%d/%m/%Y")  # Ensure date is a datetime object
-
-    # Check for group incompatibility
-    if schedule and workers and not override:
-        for job_schedule in schedule.values():
-            if date.strftime("%d/%m/%Y") in job_schedule:
-                assigned_worker_id = job_schedule[date.strftime("%d/%m/%Y")]
-                assigned_worker = next((w for w in workers if w.identification == assigned_worker_id), None)
-                if assigned_worker:
-                    logging.debug(f"Assigned worker {assigned_worker.identification} found for job on {date}")
-                    if any(group == assigned_worker.group for group in worker.group_incompatibility):
-                        logging.debug(f"Worker {worker.identification} cannot work on {date} due to group incompatibility with worker {assigned_worker.identification}.")
-                        return False
-
-    if date in [datetime.strptime(day.strip(), "%d/%m/%Y") for day in worker.unavailable_dates if day]:
-        logging.debug(f"Worker {worker.identification} cannot work on {date} due to unavailability.")
-        return False
-
-    # Check if the date is within the worker's working dates range
-    if not override:
-        for start_date, end_date in worker.work_dates:
-            if start_date <= date <= end_date:
-                break
-        else:
-            logging.debug(f"Worker {worker.identification} cannot work on {date} because it is outside their working dates.")
-            return False
-
-    if not override:
-        # Adjust the minimum distance for workers performing less than 100% of shifts
-        adjusted_min_distance = min_distance * 100 / worker.percentage_shifts
-
-        # Check across all workstations for the current worker
-        if last_shift_dates[worker.identification]:
-            last_date = last_shift_dates[worker.identification][-1]
-            days_diff = (date - last_date).days
-            logging.debug(f"Worker {worker.identification} last worked on {last_date}, {days_diff} days ago.")
-            if days_diff < adjusted_min_distance:
-                logging.debug(f"Worker {worker.identification} cannot work on {date} due to adjusted minimum distance.")
-                return False
-            if days_diff in {7, 14, 21, 28}:
-                logging.debug(f"Worker {worker.identification} cannot work on {date} due to 7, 14, 21 or 28 days constraint.")
-                return False
-            if last_date.date() == date.date():
-                logging.debug(f"Worker {worker.identification} cannot work on {date} because they already have a shift on this day.")
-
-        if is_weekend(date) or is_holiday(date.strftime("%d/%m/%Y"), holidays_set):
-            if weekend_tracker[worker.identification] >= 4:
-                logging.debug(f"Worker {worker.identification} cannot work on {date} due to weekend/holiday limit.")
-                return False
-
-        week_number = date.isocalendar()[1]
-        if weekly_tracker[worker.identification][week_number] >= max_shifts_per_week:
-            logging.debug(f"Worker {worker.identification} cannot work on {date} due to weekly quota limit.")
-            return False
-
-        if job in job_count[worker.identification] and job_count[worker.identification][job] > 0 and (date - last_shift_dates[worker.identification][-1]).days == 1:
-            logging.debug(f"Worker {worker.identification} cannot work on {date} due to job repetition limit.")
-            return False
-
-    return True
-
-def assign_worker_to_shift(worker, date, job, schedule, last_shift_dates, weekend_tracker, weekly_tracker, job_count, holidays_set, min_distance, max_shifts_per_week, obligatory=False):
-    logging.debug(f"Assigning worker {worker.identification} to job {job} on {date.strftime('%d/%m/%Y')}")
-    last_shift_dates[worker.identification].append(date)
-    schedule[job][date.strftime("%d/%m/%Y")] = worker.identification
-    job_count[worker.identification][job] += 1
-    weekly_tracker[worker.identification][date.isocalendar()[1]] += 1
-    if is_weekend(date) or is_holiday(date.strftime("%d/%m/%Y"), holidays_set):
-        weekend_tracker[worker.identification] += 1
-    worker.shift_quota -= 1
-    if obligatory:
-        worker.obligatory_coverage_shifts[date] = job  # Mark obligatory coverage shift
-    logging.debug(f"Worker {worker.identification} assigned to job {job} on {date.strftime('%d/%m/%Y')}. Updated schedule: {schedule[job][date.strftime('%d/%m/%Y')]}")
-
-def schedule_shifts(work_periods, holidays, jobs, workers, min_distance, max_shifts_per_week, previous_shifts=[]):
-    logging.debug(f"Workers: {workers}")
-    logging.debug(f"Work Periods: {work_periods}")
-    logging.debug(f"Holidays: {holidays}")
-    logging.debug(f"Jobs: {jobs}")
-
-    schedule = {job: {} for job in jobs}
-    holidays_set = set(holidays)
-    weekend_tracker = {worker.identification: 0 for worker in workers}
-    last_shift_dates = {worker.identification: [] for worker in workers}
-    job_count = {worker.identification: {job: 0 for job in jobs} for worker in workers}
-    weekly_tracker = defaultdict(lambda: defaultdict(int))
-    last_assigned_job = {worker.identification: None for worker in workers}
-    last_assigned_day = {worker.identification: None for worker in workers}
-    day_rotation_tracker = {worker.identification: {i: False for i in range(7)} for worker in workers}
+def to_day_ordinal(value):
+    # Accepts "%d/%m/%Y" strings, date/datetime objects and day ordinals
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str):
+        return datetime.strptime(value.strip(), "%d/%m/%Y").toordinal()
+    return value.toordinal()
+
+def format_day(day):
+    return date.fromordinal(day).strftime("%d/%m/%Y")
+
+def is_weekend_day(day):
+    # Day ordinal 1 is a Monday, so (day + 6) % 7 is the weekday; Friday to Sunday count as weekend
+    return (day + 6) % 7 >= 4
+
+def week_key(day):
+    # Monday-based week number counted from day ordinal 1 (a Monday): the same weeks as the ISO
+    # calendar, but never repeating from one year to the next
+    return (day - 1) // 7
+
+def count_between(days, start, end):
+    # Number of day ordinals in the sorted list days with start <= day <= end
+    return bisect_right(days, end) - bisect_left(days, start)
+
+def parse_days(values):
+    days = set()
+    for value in values:
+        if isinstance(value, str) and not value.strip():
+            continue
+        try:
+            days.add(to_day_ordinal(value))
+        except ValueError as e:
+            logger.error("Invalid date '%s': %s", value, e)
+    return days
 
+def iter_shifts(schedule):
+    # Yields (day ordinal, job, worker id) for schedules keyed by day ordinals or "%d/%m/%Y" strings
+    for job, shifts in schedule.items():
+        for day, worker_id in shifts.items():
+            yield to_day_ordinal(day), job, worker_id
+
+def iter_assignments(shifts):
+    # Like iter_shifts, but also accepts an iterable of (day, job, worker id) triples
+    if isinstance(shifts, dict):
+        yield from iter_shifts(shifts)
+        return
+    for day, job, worker_id in shifts:
+        yield to_day_ordinal(day), job, worker_id
+
+def format_schedule(schedule):
+    # Compatibility view of a day-ordinal schedule, keyed by "%d/%m/%Y" strings
+    return {job: {format_day(day) if isinstance(day, int) else day: worker_id for day, worker_id in shifts.items()} for job, shifts in schedule.items()}
+
+class AvailabilityIndex:
+    """Per-worker availability built once per run so feasibility checks are O(1) lookups.
+
+    Working periods are stored as a bytearray over day ordinals spanning every period seen,
+    unavailable dates as a set of day ordinals. Workers without work_dates can work during
+    default_periods.
+    """
+
+    def __init__(self, workers, default_periods=()):
+        periods = [(to_day_ordinal(start), to_day_ordinal(end)) for start, end in default_periods]
+        worker_periods = {}
+        for worker in workers:
+            worker_periods[worker.identification] = [(to_day_ordinal(start), to_day_ordinal(end)) for start, end in worker.work_dates] if worker.work_dates else periods[:len(default_periods)]
+            periods.extend(worker_periods[worker.identification])
+        self.first_day = min((start for start, _ in periods), default=0)
+        span = max((end for _, end in periods), default=self.first_day - 1) - self.first_day + 1
+        self.working = {}
+        self.unavailable = {}
+        shared = {}  # Workers with the same periods share one read-only bytearray
+        for worker in workers:
+            key = tuple(worker_periods[worker.identification])
+            working = shared.get(key)
+            if working is None:
+                working = shared[key] = bytearray(max(span, 0))
+                for start, end in key:
+                    if start <= end:
+                        working[start - self.first_day:end - self.first_day + 1] = b'\x01' * (end - start + 1)
+            self.working[worker.identification] = working
+            self.unavailable[worker.identification] = parse_days(worker.unavailable_dates)
+
+    def is_unavailable(self, worker_id, day):
+        return day in self.unavailable[worker_id]
+
+    def in_work_period(self, worker_id, day):
+        offset = day - self.first_day
+        working = self.working[worker_id]
+        return 0 <= offset < len(working) and working[offset] == 1
+
+def parse_work_periods(work_periods):
     valid_work_periods = []
     for period in work_periods:
         try:
@@ -139,74 +172,477 @@ def schedule_shifts(work_periods, holidays, jobs, workers, min_distance, max_shi
             end_date = datetime.strptime(end_date_str.strip(), "%d/%m/%Y")
             valid_work_periods.append((start_date, end_date))
         except ValueError as e:
-            logging.error(f"Invalid period '{period}': {e}")
+            logger.error("Invalid period '%s': %s", period, e)
+    return valid_work_periods
+
+def build_occupancy(schedule):
+    # day ordinal -> {job: worker id}, the per-day view of a schedule
+    occupancy = defaultdict(dict)
+    for day, job, worker_id in iter_shifts(schedule):
+        occupancy[day][job] = worker_id
+    return occupancy
+
+class SchedulingCancelled(Exception):
+    """Raised inside a scheduling run when its should_cancel callback returns True."""
+
+class SchedulerStats:
+    """Counters and timings collected by schedule_shifts(..., collect_stats=True).
+
+    rejections counts failed feasibility checks per constraint, phase_timings holds the
+    seconds spent per phase ("obligatory", "main_loop", and the exports the stats object is
+    passed to), and override_fallbacks counts slots only filled with override=True.
+    """
+
+    def __init__(self):
+        self.rejections = Counter()
+        self.phase_timings = defaultdict(float)
+        self.override_fallbacks = 0
+        self.slots_filled = 0
+        self.slots_unfilled = 0
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phase_timings[name] += time.perf_counter() - start
+
+    def as_dict(self):
+        return {
+            'rejections': dict(self.rejections),
+            'phase_timings': dict(self.phase_timings),
+            'override_fallbacks': self.override_fallbacks,
+            'slots_filled': self.slots_filled,
+            'slots_unfilled': self.slots_unfilled,
+        }
+
+    def __repr__(self):
+        return f"SchedulerStats({self.as_dict()})"
+
+def timed_phase(stats, name):
+    # No-op context manager when stats collection is off
+    return stats.phase(name) if stats is not None else nullcontext()
+
+def make_trackers(max_shifts_per_week):
+    # Empty trackers for rejection_reason and assign_worker_to_shift, which expect shifts to be
+    # assigned in day order: last shift day, rings of the recent weekend/holiday shift days and
+    # of the recent shift days (for the weekly cap), and shift counts per job
+    last_shift_dates = {}
+    weekend_tracker = defaultdict(lambda: deque(maxlen=WEEKEND_SHIFT_LIMIT))
+    weekly_tracker = defaultdict(lambda: deque(maxlen=max(max_shifts_per_week, 1)))
+    job_count = defaultdict(Counter)
+    return last_shift_dates, weekend_tracker, weekly_tracker, job_count
+
+def group_conflict(worker, assigned_worker_ids, worker_groups, worker_incompatibility):
+    # Whether worker would share the day with someone of a group it lists, or with someone who
+    # lists its group: the rule holds both ways, whoever is placed first
+    return any(other != worker.identification and (worker_groups.get(other) in worker.group_incompatibility or worker.group in worker_incompatibility.get(other, ()))
+               for other in assigned_worker_ids)
+
+def rejection_reason(worker, day, last_shift_dates, weekend_tracker, holidays_set, weekly_tracker, job, job_count, min_distance, max_shifts_per_week, override=False, availability=None, occupancy=None, worker_groups=None, worker_incompatibility=None):
+    # Returns the first constraint that keeps worker from taking job on day, or None; see
+    # make_trackers for the tracker types. worker_incompatibility maps worker ids to their
+    # group_incompatibility, for the other direction of the group check
+    if occupancy is not None and worker_groups is not None and not override:
+        if group_conflict(worker, occupancy.get(day, {}).values(), worker_groups, worker_incompatibility or {}):
+            return GROUP_INCOMPATIBILITY
+
+    if availability.is_unavailable(worker.identification, day):
+        return UNAVAILABLE
+
+    if override:
+        return None
 
-    total_days = sum((end_date - start_date).days + 1 for start_date, end_date in valid_work_periods)
-    jobs_per_day = len(jobs)
-    calculate_shift_quota(workers, total_days, jobs_per_day)
+    # Check if the date is within the worker's working dates range
+    if not availability.in_work_period(worker.identification, day):
+        return OUTSIDE_WORK_PERIOD
+
+    # Adjust the minimum distance for workers performing less than 100% of shifts
+    adjusted_min_distance = min_distance * 100 / worker.percentage_shifts
+
+    # Check across all workstations for the current worker
+    last_day = last_shift_dates.get(worker.identification)
+    if last_day is not None:
+        days_diff = day - last_day
+        if days_diff < adjusted_min_distance:
+            return MIN_DISTANCE
+        if days_diff in REST_PATTERN_DAYS:
+            return REST_PATTERN
+
+    if is_weekend_day(day) or day in holidays_set:
+        if sum(1 for other in weekend_tracker[worker.identification] if day - WEEKEND_WINDOW_DAYS < other <= day) >= WEEKEND_SHIFT_LIMIT:
+            return WEEKEND_LIMIT
+
+    week = week_key(day)
+    if sum(1 for other in weekly_tracker[worker.identification] if week_key(other) == week) >= max_shifts_per_week:
+        return WEEKLY_LIMIT
+
+    if job_count[worker.identification].get(job, 0) > 0 and last_day is not None and day - last_day == 1:
+        return JOB_REPETITION
+
+    return None
+
+def can_work_on_date(worker, date, last_shift_dates, weekend_tracker, holidays_set, weekly_tracker, job, job_count, min_distance, max_shifts_per_week, override=False, schedule=None, workers=None, availability=None, occupancy=None, worker_groups=None, worker_incompatibility=None):
+    # date is a day ordinal (strings and datetimes are converted); holidays_set holds day ordinals
+    day = to_day_ordinal(date)
+    if availability is None:
+        availability = AvailabilityIndex([worker])
+    if occupancy is None and schedule and workers:
+        occupancy = build_occupancy(schedule)
+    if worker_groups is None and workers:
+        worker_groups = {w.identification: w.group for w in workers}
+    if worker_incompatibility is None and workers:
+        worker_incompatibility = {w.identification: w.group_incompatibility for w in workers}
+    reason = rejection_reason(worker, day, last_shift_dates, weekend_tracker, holidays_set, weekly_tracker, job, job_count, min_distance, max_shifts_per_week, override, availability, occupancy, worker_groups, worker_incompatibility)
+    if reason is not None and logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Worker %s cannot work on %s: %s", worker.identification, format_day(day), reason)
+    return reason is None
+
+def assign_worker_to_shift(worker, date, job, schedule, last_shift_dates, weekend_tracker, weekly_tracker, job_count, holidays_set, min_distance, max_shifts_per_week, obligatory=False, occupancy=None):
+    # schedule is keyed by day ordinals, see format_schedule for the "%d/%m/%Y" view
+    day = to_day_ordinal(date)
+    last_shift_dates[worker.identification] = day
+    schedule[job][day] = worker.identification
+    if occupancy is not None:
+        occupancy[day][job] = worker.identification
+    job_count[worker.identification][job] += 1
+    weekly_tracker[worker.identification].append(day)
+    if is_weekend_day(day) or day in holidays_set:
+        weekend_tracker[worker.identification].append(day)
+    worker.shift_quota -= 1
+    if obligatory:
+        worker.obligatory_coverage_shifts[day] = job  # Mark obligatory coverage shift
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Worker %s assigned to job %s on %s", worker.identification, job, format_day(day))
+
+class CandidateQueue:
+    """Workers with remaining shift_quota, kept in a heap ordered by the selection key.
+
+    The key is the one schedule_shifts has always maximised: days since the last shift,
+    remaining shift_quota and percentage_shifts, with ties left to a per-slot tie_break
+    (job/weekday rotation flags) and finally to roster order. Only the assigned worker's
+    key changes after each assignment, so it is re-pushed and its old entry goes stale.
+    """
+
+    def __init__(self, workers, last_day):
+        # last_day(worker) returns the day ordinal of the worker's last shift, or None
+        self.workers = list(workers)
+        self.last_day = last_day
+        self.versions = [0] * len(self.workers)
+        self.positions = {id(worker): index for index, worker in enumerate(self.workers)}
+        self.heap = [self._entry(index) for index, worker in enumerate(self.workers) if worker.shift_quota > 0]
+        heapq.heapify(self.heap)
+
+    def _entry(self, index):
+        worker = self.workers[index]
+        last_day = self.last_day(worker)
+        return (float('-inf') if last_day is None else last_day, -worker.shift_quota, -worker.percentage_shifts, index, self.versions[index])
+
+    def select(self, accept, tie_break):
+        # Pops entries best-first until the first accepted worker's key prefix is exhausted,
+        # then picks among the accepted workers sharing that prefix with tie_break, which
+        # returns a tuple of booleans
+        popped = []
+        best_prefix = None
+        accepted = []
+        while self.heap:
+            entry = heapq.heappop(self.heap)
+            index = entry[3]
+            if entry[4] != self.versions[index]:
+                continue
+            popped.append(entry)
+            if best_prefix is not None and entry[:3] != best_prefix:
+                break
+            if accept(self.workers[index]):
+                best_prefix = entry[:3]
+                accepted.append(index)
+                if all(tie_break(self.workers[index])):
+                    break  # Nothing later in the heap can beat an all-True tie break
+        chosen = max(accepted, key=lambda index: tie_break(self.workers[index])) if accepted else None
+        for entry in popped:
+            if entry[3] != chosen:
+                heapq.heappush(self.heap, entry)
+        return self.workers[chosen] if chosen is not None else None
+
+    def update(self, worker):
+        index = self.positions[id(worker)]
+        self.versions[index] += 1
+        if worker.shift_quota > 0:
+            heapq.heappush(self.heap, self._entry(index))
+
+class ScheduleRun:
+    """Tracker state for one scheduling run, shared by the scheduling engines.
+
+    Building a run parses the work periods and holidays, computes shift quotas and the
+    availability index; assign_obligatory_shifts then places obligatory coverage before an
+    engine fills the remaining (day, job) slots.
+
+    Trackers are flat arrays indexed by an integer row per worker identification (see rows):
+    last_day, last_job and last_weekday per row, job_count per row and job, and rotation as a
+    bitmask of the weekdays worked. The weekly cap and the weekend/holiday limit read two rings
+    per row holding the days of the most recent shifts (recent, max_shifts_per_week slots) and
+    weekend/holiday shifts (recent_weekend, WEEKEND_SHIFT_LIMIT slots). The engines assign in
+    day order, so a ring holds every shift that can still count towards its window and the
+    memory per worker stays the same however long the run is. Obligatory shifts are placed
+    before that, out of order, so they are kept apart in fixed and fixed_weekend.
+    """
+
+    def __init__(self, work_periods, holidays, jobs, workers, min_distance, max_shifts_per_week, stats=None, seed=None, previous_shifts=(), progress=None, should_cancel=None, availability=None):
+        logger.debug("Scheduling %d workers over %s, holidays %s, jobs %s", len(workers), work_periods, holidays, jobs)
+
+        if seed is not None:
+            # Roster order is the final tie-break of every engine, so a seeded shuffle gives
+            # a different but equally valid schedule
+            workers = list(workers)
+            random.Random(seed).shuffle(workers)
+        self.stats = stats
+        self.progress = progress
+        self.should_cancel = should_cancel
+        self.slots_filled = 0
+        self.jobs = jobs
+        self.workers = workers
+        self.min_distance = min_distance
+        self.max_shifts_per_week = max_shifts_per_week
+        self.schedule = {job: {} for job in jobs}
+        self.holidays_set = parse_days(holidays)
+        self.rows = {}
+        for worker in workers:
+            self.rows.setdefault(worker.identification, len(self.rows))
+        self.job_codes = {job: code for code, job in enumerate(jobs)}
+        count = len(self.rows)
+        self.last_day = array('q', [NO_SHIFT]) * count
+        self.job_count = array('l', [0]) * (count * len(jobs))
+        self.week_slots = max(int(max_shifts_per_week), 1)
+        self.recent = array('q', [NO_SHIFT]) * (count * self.week_slots)
+        self.recent_next = array('l', [0]) * count
+        self.recent_weekend = array('q', [NO_SHIFT]) * (count * WEEKEND_SHIFT_LIMIT)
+        self.recent_weekend_next = array('l', [0]) * count
+        self.fixed = defaultdict(list)  # row -> sorted obligatory shift days
+        self.fixed_weekend = defaultdict(list)  # row -> the weekend/holiday ones among them
+        self.last_job = array('l', [-1]) * count
+        self.last_weekday = array('b', [-1]) * count
+        self.rotation = bytearray(count)
+        self.occupancy = defaultdict(dict)
+        self.worker_groups = {worker.identification: worker.group for worker in workers}
+        self.worker_incompatibility = {worker.identification: worker.group_incompatibility for worker in workers if worker.group_incompatibility}
+        self.day_groups = defaultdict(set)  # day -> groups of the workers placed, for a quick group_conflict pre-check
+        self.day_listed = defaultdict(set)  # day -> groups those workers list
+
+        self.valid_work_periods = parse_work_periods(work_periods)
+
+        self.total_days = total_days = sum((end_date - start_date).days + 1 for start_date, end_date in self.valid_work_periods)
+        jobs_per_day = len(jobs)
+        calculate_shift_quota(workers, total_days, jobs_per_day)
+
+        # Workers without work_dates can work the whole run, see AvailabilityIndex; a prebuilt
+        # index for the same workers and work periods can be passed in, as sweep does
+        self.availability = availability if availability is not None else AvailabilityIndex(workers, self.valid_work_periods)
+        self.seed_previous_shifts(previous_shifts)
+
+    def seed_previous_shifts(self, previous_shifts):
+        # Replays shifts worked before this run (e.g. last month's schedule) into the distance,
+        # rest pattern, job, rotation and window trackers, so the weekly cap and weekend limit
+        # carry over. They use no quota and are not part of the new schedule.
+        first_day = min((start_date.toordinal() for start_date, _ in self.valid_work_periods), default=None)
+        if first_day is None:
+            return
+        for day, job, worker_id in sorted(iter_assignments(previous_shifts)):
+            row = self.rows.get(worker_id)
+            if day >= first_day or row is None:
+                continue
+            self.last_day[row] = day
+            code = self.job_codes.get(job, -1)
+            if code >= 0:
+                self.job_count[row * len(self.jobs) + code] += 1
+            self.record_recent(row, day)
+            self.last_job[row] = code
+            self.last_weekday[row] = (day + 6) % 7
+            self.rotation[row] |= 1 << (day + 6) % 7
+
+    def days(self):
+        for start_date, end_date in self.valid_work_periods:
+            yield from range(start_date.toordinal(), end_date.toordinal() + 1)
+
+    def checkpoint(self, days_done):
+        # Called by the engines before each day: honours cancellation and reports progress
+        if self.should_cancel is not None and self.should_cancel():
+            raise SchedulingCancelled(f"Scheduling cancelled after {days_done} of {self.total_days} days")
+        if self.progress is not None:
+            self.progress(days_done, self.total_days, self.slots_filled)
+
+    def record_recent(self, row, day):
+        # Writes day over the oldest slot of the row's recent shift ring(s)
+        slot = self.recent_next[row]
+        self.recent[row * self.week_slots + slot] = day
+        self.recent_next[row] = (slot + 1) % self.week_slots
+        if is_weekend_day(day) or day in self.holidays_set:
+            slot = self.recent_weekend_next[row]
+            self.recent_weekend[row * WEEKEND_SHIFT_LIMIT + slot] = day
+            self.recent_weekend_next[row] = (slot + 1) % WEEKEND_SHIFT_LIMIT
+
+    def shifts_in_week(self, row, day):
+        monday = week_key(day) * 7 + 1
+        start = row * self.week_slots
+        count = sum(monday <= other < monday + 7 for other in self.recent[start:start + self.week_slots])
+        fixed = self.fixed.get(row)
+        return count + count_between(fixed, monday, monday + 6) if fixed else count
+
+    def weekend_shifts_in_window(self, row, day):
+        # Weekend/holiday shifts within the WEEKEND_WINDOW_DAYS days ending on day
+        start = row * WEEKEND_SHIFT_LIMIT
+        count = sum(day - WEEKEND_WINDOW_DAYS < other <= day for other in self.recent_weekend[start:start + WEEKEND_SHIFT_LIMIT])
+        fixed = self.fixed_weekend.get(row)
+        return count + count_between(fixed, day - WEEKEND_WINDOW_DAYS + 1, day) if fixed else count
+
+    def last_day_of(self, worker):
+        last_day = self.last_day[self.rows[worker.identification]]
+        return None if last_day == NO_SHIFT else last_day
+
+    def rejection_reason(self, worker, day, job, override=False):
+        # rejection_reason over the run's tracker arrays, the same checks in the same order
+        if not override and (worker.group in self.day_listed[day] or not self.day_groups[day].isdisjoint(worker.group_incompatibility)):
+            if group_conflict(worker, self.occupancy.get(day, {}).values(), self.worker_groups, self.worker_incompatibility):
+                return GROUP_INCOMPATIBILITY
+        if self.availability.is_unavailable(worker.identification, day):
+            return UNAVAILABLE
+        if override:
+            return None
+        if not self.availability.in_work_period(worker.identification, day):
+            return OUTSIDE_WORK_PERIOD
+        row = self.rows[worker.identification]
+        last_day = self.last_day[row]
+        if last_day != NO_SHIFT:
+            days_diff = day - last_day
+            if days_diff < self.min_distance * 100 / worker.percentage_shifts:
+                return MIN_DISTANCE
+            if days_diff in REST_PATTERN_DAYS:
+                return REST_PATTERN
+        if (is_weekend_day(day) or day in self.holidays_set) and self.weekend_shifts_in_window(row, day) >= WEEKEND_SHIFT_LIMIT:
+            return WEEKEND_LIMIT
+        if self.shifts_in_week(row, day) >= self.max_shifts_per_week:
+            return WEEKLY_LIMIT
+        if last_day != NO_SHIFT and day - last_day == 1 and self.job_count[row * len(self.jobs) + self.job_codes[job]] > 0:
+            return JOB_REPETITION
+        return None
+
+    def can_work(self, worker, day, job, override=False):
+        reason = self.rejection_reason(worker, day, job, override)
+        if reason is None:
+            return True
+        if self.stats is not None:
+            self.stats.rejections[reason] += 1
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Worker %s cannot work on %s: %s", worker.identification, format_day(day), reason)
+        return False
 
-    for worker in workers:
-        if not worker.work_dates:
-            worker.work_dates = valid_work_periods
-
-        for date_str in worker.obligatory_coverage:
-            if date_str.strip():
-                date = datetime.strptime(date_str.strip(), "%d/%m/%Y")
-                logging.debug(f"Trying to assign obligatory coverage shift for Worker {worker.identification} on {date} for jobs {jobs}")
-                for job in jobs:
-                    if can_work_on_date(worker, date, last_shift_dates, weekend_tracker, holidays_set, weekly_tracker, job, job_count, min_distance, max_shifts_per_week, override=True, schedule=schedule, workers=workers):
-                        assign_worker_to_shift(worker, date, job, schedule, last_shift_dates, weekend_tracker, weekly_tracker, job_count, holidays_set, min_distance, max_shifts_per_week, obligatory=True)
-                        last_assigned_job[worker.identification] = job
-                        last_assigned_day[worker.identification] = date.weekday()
-                        day_rotation_tracker[worker.identification][date.weekday()] = True
-                        logging.debug(f"Assigned obligatory coverage shift for Worker {worker.identification} on {date} for job {job}")
+    def tie_break(self, worker, day, job):
+        row = self.rows[worker.identification]
+        weekday = (day + 6) % 7
+        return (self.last_job[row] != self.job_codes[job], self.last_weekday[row] != weekday, not self.rotation[row] >> weekday & 1)
+
+    def assign(self, worker, day, job, obligatory=False):
+        row = self.rows[worker.identification]
+        code = self.job_codes[job]
+        self.schedule[job][day] = worker.identification
+        self.occupancy[day][job] = worker.identification
+        self.day_groups[day].add(worker.group)
+        self.day_listed[day].update(worker.group_incompatibility)
+        self.last_day[row] = day
+        self.job_count[row * len(self.jobs) + code] += 1
+        self.last_job[row] = code
+        self.last_weekday[row] = (day + 6) % 7
+        self.rotation[row] |= 1 << (day + 6) % 7
+        worker.shift_quota -= 1
+        if obligatory:
+            worker.obligatory_coverage_shifts[day] = job  # Mark obligatory coverage shift
+            insort(self.fixed[row], day)
+            if is_weekend_day(day) or day in self.holidays_set:
+                insort(self.fixed_weekend[row], day)
+        else:
+            self.record_recent(row, day)
+        self.slots_filled += 1
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Worker %s assigned to job %s on %s", worker.identification, job, format_day(day))
+
+    def assign_obligatory_shifts(self):
+        for worker in self.workers:
+            for value in worker.obligatory_coverage:
+                if isinstance(value, str) and not value.strip():
+                    continue
+                day = to_day_ordinal(value)
+                for job in self.jobs:
+                    if self.can_work(worker, day, job, override=True):
+                        self.assign(worker, day, job, obligatory=True)
                         break
                 else:
-                    logging.debug(f"Worker {worker.identification} cannot be assigned for obligatory coverage on {date} for any job.")
-                    continue
-
-    for start_date, end_date in valid_work_periods:
-        for date in generate_date_range(start_date, end_date):
-            date_str = date.strftime("%d/%m/%Y")
-            for job in jobs:
-                if any(worker.obligatory_coverage_shifts.get(date) == job for worker in workers):
-                    continue  # Skip if obligatory coverage shift exists
-                logging.debug(f"Processing job '{job}' on date {date_str}")
-
-                assigned = False
-                iteration_count = 0
-                max_iterations = len(workers) * 2
-
-                while not assigned and iteration_count < max_iterations:
-                    available_workers = [worker for worker in workers if worker.shift_quota > 0 and can_work_on_date(worker, date_str, last_shift_dates, weekend_tracker, holidays_set, weekly_tracker, job, job_count, min_distance, max_shifts_per_week)]
-                    if not available_workers:
-                        available_workers = [worker for worker in workers if worker.shift_quota > 0 and can_work_on_date(worker, date_str, last_shift_dates, weekend_tracker, holidays_set, weekly_tracker, job, job_count, min_distance, max_shifts_per_week, override=True)]
-                        if not available_workers:
-                            logging.error(f"No available workers for job {job} on {date_str}. Stopping assignment.")
-                            return schedule
-
-                    worker = max(available_workers, key=lambda w: (
-                        (date - last_shift_dates[w.identification][-1]).days if last_shift_dates[w.identification] else float('inf'),
-                        w.shift_quota,
-                        w.percentage_shifts,
-                        last_assigned_job[w.identification] != job,
-                        last_assigned_day[w.identification] != date.weekday(),
-                        not day_rotation_tracker[w.identification][date.weekday()]
-                    ))
-                    assign_worker_to_shift(worker, date, job, schedule, last_shift_dates, weekend_tracker, weekly_tracker, job_count, holidays_set, min_distance, max_shifts_per_week)
-                    last_assigned_job[worker.identification] = job
-                    last_assigned_day[worker.identification] = date.weekday()
-                    day_rotation_tracker[worker.identification][date.weekday()] = True
-                    logging.debug(f"Assigned shift for Worker {worker.identification} on {date} for job {job}")
-                    assigned = True
-
-                    iteration_count += 1
-                    if iteration_count >= max_iterations:
-                        logging.error(f"Exceeded maximum iterations for job {job} on {date_str}. Exiting to prevent infinite loop.")
-                        return schedule
-
-    logging.debug(f"Final schedule: {schedule}")
-    return schedule
+                    logger.debug("Worker %s cannot be assigned for obligatory coverage on %s for any job.", worker.identification, value)
+
+    def count_slots(self):
+        if self.stats is not None:
+            self.stats.slots_filled = sum(len(shifts) for shifts in self.schedule.values())
+            self.stats.slots_unfilled = sum(1 for day in self.days() for job in self.jobs if job not in self.occupancy.get(day, ()))
+
+def fill_greedy(run):
+    candidates = CandidateQueue(run.workers, run.last_day_of)
+    for days_done, day in enumerate(run.days()):
+        run.checkpoint(days_done)
+        for job in run.jobs:
+            if job in run.occupancy[day]:
+                continue  # Skip if obligatory coverage shift exists
+
+            tie_break = lambda w: run.tie_break(w, day, job)
+            worker = candidates.select(lambda w: run.can_work(w, day, job), tie_break)
+            if worker is None:
+                worker = candidates.select(lambda w: run.can_work(w, day, job, override=True), tie_break)
+                if worker is None:
+                    logger.error("No available workers for job %s on %s. Stopping assignment.", job, format_day(day))
+                    return
+                if run.stats is not None:
+                    run.stats.override_fallbacks += 1
+
+            run.assign(worker, day, job)
+            candidates.update(worker)
+
+def schedule_shifts(work_periods, holidays, jobs, workers, min_distance, max_shifts_per_week, previous_shifts=[], engine="greedy", collect_stats=False, seed=None, progress=None, should_cancel=None):
+    # Returns {job: {"%d/%m/%Y": worker id}}; schedule_shifts_by_day returns the day-ordinal schedule
+    result = schedule_shifts_by_day(work_periods, holidays, jobs, workers, min_distance, max_shifts_per_week, previous_shifts, engine, collect_stats, seed, progress, should_cancel)
+    if collect_stats:
+        schedule, stats = result
+        return format_schedule(schedule), stats
+    return format_schedule(result)
+
+def schedule_shifts_by_day(work_periods, holidays, jobs, workers, min_distance, max_shifts_per_week, previous_shifts=[], engine="greedy", collect_stats=False, seed=None, progress=None, should_cancel=None, availability=None):
+    # engine="numpy" runs the vectorized engine (requires numpy), with the same results as "greedy".
+    # engine="matching" fills each day by min-cost matching and never stops early, see matching_scheduler.
+    # collect_stats=True returns (schedule, SchedulerStats) instead of the schedule alone.
+    # seed shuffles the roster order used to break ties, see multistart for picking the best of several.
+    # previous_shifts, a schedule or (day, job, worker id) triples from before work_periods, carries
+    # over the rest, weekly and weekend limits; see rescheduler for repairing an existing schedule.
+    # progress(days done, total days, slots filled) is called once per day; when should_cancel()
+    # returns True the run stops with SchedulingCancelled. availability is an optional prebuilt
+    # AvailabilityIndex of these workers over work_periods.
+    if engine == "greedy":
+        fill = fill_greedy
+    elif engine == "numpy":
+        from vectorized_scheduler import fill_vectorized as fill
+    elif engine == "matching":
+        from matching_scheduler import fill_matching as fill
+    else:
+        raise ValueError(f"Unknown scheduling engine '{engine}'")
+
+    stats = SchedulerStats() if collect_stats else None
+    run = ScheduleRun(work_periods, holidays, jobs, workers, min_distance, max_shifts_per_week, stats, seed, previous_shifts, progress, should_cancel, availability)
+    with timed_phase(stats, "obligatory"):
+        run.assign_obligatory_shifts()
+    with timed_phase(stats, "main_loop"):
+        fill(run)
+    if progress is not None:
+        progress(run.total_days, run.total_days, run.slots_filled)
+    if collect_stats:
+        run.count_slots()
+        return run.schedule, stats
+    return run.schedule
 
 def prepare_breakdown(schedule):
     breakdown = defaultdict(list)
@@ -219,17 +655,24 @@ def export_breakdown(breakdown):
     output = ""
     for worker_id, shifts in breakdown.items():
         output += f"Worker {worker_id}:\n"
-        for date, job in shifts:
-            output += f"  {date}: {job}\n"
+        for day, job in shifts:
+            output += f"  {format_day(day) if isinstance(day, int) else day}: {job}\n"
     return output
     
-def export_schedule_to_csv(schedule, filename='shift_schedule.csv'):
-    with open(filename, mode='w', newline='') as file:
+def export_schedule_to_csv(schedule, filename='shift_schedule.csv', stats=None):
+    with timed_phase(stats, "export_csv"), open(filename, mode='w', newline='') as file:
         writer = csv.writer(file)
         writer.writerow(['Job', 'Date', 'Worker'])
-        for job, shifts in schedule.items():
-            for date, worker in shifts.items():
-                writer.writerow([job, date, worker])
+        for day, job, worker in iter_shifts(schedule):
+            writer.writerow([job, format_day(day), worker])
+
+def import_schedule_from_csv(filename):
+    # Reads a schedule written by export_schedule_to_csv (or another source in its Job, Date, Worker layout)
+    schedule = defaultdict(dict)
+    with open(filename, newline='', encoding='utf-8') as file:
+        for row in csv.DictReader(file):
+            schedule[row['Job']][to_day_ordinal(row['Date'])] = row['Worker']
+    return dict(schedule)
                 
 if __name__ == "__main__":
     # User input for the required parameters
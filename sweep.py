@@ -0,0 +1,90 @@
+import copy
+import itertools
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from shift_scheduler import AvailabilityIndex, parse_work_periods, schedule_shifts_by_day
+from schedule_metrics import ScheduleMetrics
+
+logger = logging.getLogger(__name__)
+
+class RosterIndex:
+    """A roster parsed once for a sweep: its workers and their AvailabilityIndex.
+
+    Working periods and unavailable dates do not depend on the swept rules, so every grid
+    point reuses the same index; each point runs on shallow copies of the workers carrying
+    its percentages.
+    """
+
+    def __init__(self, roster):
+        self.roster = roster
+        self.availability = AvailabilityIndex(roster['workers'], parse_work_periods(roster['work_periods']))
+
+    def workers(self, percentages):
+        copies = []
+        for worker in self.roster['workers']:
+            worker = copy.copy(worker)
+            worker.obligatory_coverage_shifts = {}
+            if worker.identification in percentages:
+                worker.percentage_shifts = float(percentages[worker.identification])
+            copies.append(worker)
+        return copies
+
+def sweep_grid(roster, min_distances=None, max_shifts_per_week=None, job_lists=None, percentage_variants=None):
+    """The grid points of a sweep, each a dict of min_distance, max_shifts_per_week, jobs and percentages.
+
+    Every argument is a list of values to try and defaults to the roster's own value;
+    percentages are {worker id: percentage} overrides, {} keeping the roster's.
+    """
+    return [{'min_distance': min_distance, 'max_shifts_per_week': max_shifts, 'jobs': list(jobs), 'percentages': dict(percentages)}
+            for min_distance, max_shifts, jobs, percentages in itertools.product(
+                min_distances or [roster['min_distance']], max_shifts_per_week or [roster['max_shifts_per_week']],
+                job_lists or [roster['jobs']], percentage_variants or [{}])]
+
+_index = None  # The RosterIndex of a pool process, set by _init_sweep
+
+def _init_sweep(index):
+    global _index
+    _index = index
+
+def _evaluate(point, engine):
+    # Runs in a pool process against the shared index
+    roster = _index.roster
+    workers = _index.workers(point['percentages'])
+    start = time.perf_counter()
+    schedule = schedule_shifts_by_day(roster['work_periods'], roster['holidays'], point['jobs'], workers, point['min_distance'], point['max_shifts_per_week'],
+                                      roster.get('previous_shifts', []), engine, availability=_index.availability)
+    seconds = time.perf_counter() - start
+    score = ScheduleMetrics(workers, roster['work_periods'], roster['holidays'], point['jobs'], schedule).score()
+    return dict(point, coverage=score['coverage'], unfilled=score['slots'] - score['filled'], quota_deviation=score['quota_deviation'],
+                weekend_imbalance=score['weekend_imbalance'], seconds=seconds)
+
+def run_sweep(roster, points, engine="greedy", max_workers=None):
+    """Schedules roster (schedule_shifts keyword arguments) once per grid point in a process pool.
+
+    The roster is indexed once into a RosterIndex, which each pool process receives through
+    its initializer instead of with every point. Returns one result dict per point, in grid
+    order: the point plus coverage, unfilled slots, quota_deviation, weekend_imbalance and
+    the scheduling seconds.
+    """
+    index = RosterIndex(roster)
+    max_workers = min(max_workers or os.cpu_count() or 1, len(points)) or 1
+    logger.info("Sweeping %d grid points with %d processes", len(points), max_workers)
+    results = [None] * len(points)
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_sweep, initargs=(index,)) as executor:
+        futures = {executor.submit(_evaluate, point, engine): position for position, point in enumerate(points)}
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+    return results
+
+def _describe_percentages(percentages):
+    return ",".join(f"{worker_id}={percentage:g}" for worker_id, percentage in percentages.items()) or "roster"
+
+def format_sweep(results):
+    # Plain-text comparison table of run_sweep results, one line per grid point
+    lines = [f"{'Min dist':>8} {'Max/week':>8} {'Jobs':<16} {'Percentages':<20} {'Coverage':>9} {'Unfilled':>8} {'Deviation':>9} {'Weekend':>8} {'Sched s':>8}"]
+    for result in results:
+        lines.append(f"{result['min_distance']:>8} {result['max_shifts_per_week']:>8} {','.join(map(str, result['jobs'])):<16} {_describe_percentages(result['percentages']):<20} "
+                     f"{result['coverage']:>9.1%} {result['unfilled']:>8} {result['quota_deviation']:>9.2f} {result['weekend_imbalance']:>8.2f} {result['seconds']:>8.2f}")
+    return "\n".join(lines)
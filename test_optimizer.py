@@ -0,0 +1,21 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+from benchmark import generate_roster
+from optimizer import LocalSearch
+from schedule_verifier import verify_schedule
+from shift_scheduler import schedule_shifts_by_day
+
+def violation_keys(schedule, roster):
+    return {(violation.rule, violation.day, violation.job, violation.worker_id)
+            for violation in verify_schedule(schedule, roster['work_periods'], roster['holidays'], roster['workers'], roster['min_distance'], roster['max_shifts_per_week'])}
+
+@pytest.mark.parametrize("seed", [3, 11, 17, 23])
+def test_local_search_adds_no_violations(seed):
+    roster = generate_roster(60, 200, 3, seed=seed)
+    schedule = schedule_shifts_by_day(**roster)
+    search = LocalSearch(schedule, roster['work_periods'], roster['holidays'], roster['jobs'], roster['workers'], roster['min_distance'], roster['max_shifts_per_week'])
+    report = search.run(time_budget=60, seed=1, max_iterations=20000)
+    assert report.moves_accepted > 0
+    assert violation_keys(search.schedule(), roster) <= violation_keys(schedule, roster)
@@ -0,0 +1,27 @@
+import random
+import pytest
+
+pytest.importorskip("numpy")
+
+from benchmark import generate_roster
+from rescheduler import RosterChange, reschedule
+from schedule_verifier import verify_schedule
+from shift_scheduler import iter_shifts, schedule_shifts_by_day
+
+def violation_keys(schedule, roster, workers, holidays):
+    return {(violation.rule, violation.day, violation.job, violation.worker_id)
+            for violation in verify_schedule(schedule, roster['work_periods'], holidays, workers, roster['min_distance'], roster['max_shifts_per_week'])}
+
+@pytest.mark.parametrize("seed", range(40))
+def test_reschedule_adds_no_violations(seed):
+    # Marks three shifts of one worker unavailable, as a sick note would
+    roster = generate_roster(30, 150, 3, seed=seed)
+    schedule = schedule_shifts_by_day(**roster)
+    rnd = random.Random(seed)
+    worker_id = rnd.choice(roster['workers']).identification
+    days = [day for day, _, other in iter_shifts(schedule) if other == worker_id]
+    change = RosterChange(unavailable_dates={worker_id: rnd.sample(days, min(3, len(days)))})
+    repaired, report = reschedule(schedule, roster['work_periods'], roster['holidays'], roster['jobs'], roster['workers'], roster['min_distance'], roster['max_shifts_per_week'], change)
+    workers, holidays = change.apply(roster['workers'], roster['holidays'])
+    assert all(repaired[job].get(day) != worker_id for day, job in report.impacted)
+    assert violation_keys(repaired, roster, workers, holidays) <= violation_keys(schedule, roster, roster['workers'], roster['holidays'])
@@ -0,0 +1,38 @@
+import random
+import pytest
+
+pytest.importorskip("numpy")
+
+from benchmark import generate_roster
+from shift_scheduler import schedule_shifts_by_day
+
+def make_roster(seed, num_workers, num_days, num_jobs):
+    # generate_roster, with more incompatible groups and obligatory shifts than it draws by default
+    roster = generate_roster(num_workers, num_days, num_jobs, seed=seed)
+    rnd = random.Random(seed)
+    for worker in roster['workers']:
+        if rnd.random() < 0.3:
+            worker.group_incompatibility = rnd.sample(['1', '2', '3'], rnd.randint(1, 2))
+        if rnd.random() < 0.2:
+            worker.obligatory_coverage = worker.obligatory_coverage + [day for day in roster['holidays'][:1] if day not in worker.unavailable_dates]
+    return roster
+
+@pytest.mark.parametrize("seed", range(8))
+@pytest.mark.parametrize("num_workers, num_days, num_jobs", [(6, 45, 2), (15, 120, 3), (30, 200, 4)])
+def test_numpy_matches_greedy(seed, num_workers, num_days, num_jobs):
+    schedules = {}
+    for engine in ("greedy", "numpy"):
+        roster = make_roster(seed, num_workers, num_days, num_jobs)  # Fresh workers, runs record obligatory shifts on them
+        schedules[engine] = schedule_shifts_by_day(**roster, engine=engine)
+    assert any(schedules["greedy"].values())
+    assert schedules["numpy"] == schedules["greedy"]
+
+@pytest.mark.parametrize("seed", range(4))
+def test_numpy_matches_greedy_with_previous_shifts_and_seed(seed):
+    schedules = {}
+    for engine in ("greedy", "numpy"):
+        roster = make_roster(seed, 12, 90, 3)
+        previous = schedule_shifts_by_day(**make_roster(seed + 100, 12, 90, 3))
+        previous_shifts = [(day - 90, job, worker_id) for job, days in previous.items() for day, worker_id in days.items()]
+        schedules[engine] = schedule_shifts_by_day(**roster, previous_shifts=previous_shifts, engine=engine, seed=seed)
+    assert schedules["numpy"] == schedules["greedy"]
@@ -0,0 +1,163 @@
+import logging
+import numpy as np
+from shift_scheduler import (
+    format_day, group_conflict, is_weekend_day, GROUP_INCOMPATIBILITY, UNAVAILABLE, OUTSIDE_WORK_PERIOD,
+    MIN_DISTANCE, REST_PATTERN, WEEKEND_LIMIT, WEEKLY_LIMIT, JOB_REPETITION, REST_PATTERN_DAYS, WEEKEND_SHIFT_LIMIT, WEEKEND_WINDOW_DAYS, NO_SHIFT
+)
+
+logger = logging.getLogger(__name__)
+
+class FeasibilityMatrix:
+    """Boolean workers x days matrices plus per-worker counter arrays for one ScheduleRun.
+
+    Static constraints (working periods, unavailable dates, weekend/holiday flags, group
+    membership) are precomputed once; the dynamic ones (adjusted min distance, the
+    7/14/21/28-day rule, weekly and weekend caps) are evaluated per slot as vectorized masks
+    over the counter arrays and the run's recent shift rings, mirroring can_work_on_date.
+    """
+
+    def __init__(self, run):
+        self.run = run
+        workers = run.workers
+        days = list(run.days())
+        self.first_day = min(days) if days else 0
+        span = max(days) - self.first_day + 1 if days else 0
+        count = len(workers)
+
+        self.working = np.zeros((count, span), dtype=bool)
+        self.unavailable = np.zeros((count, span), dtype=bool)
+        index = run.availability
+        for row, worker in enumerate(workers):
+            working = np.frombuffer(bytes(index.working[worker.identification]), dtype=np.uint8).astype(bool)
+            # The index always spans the run's own periods, so it starts on or before first_day
+            chunk = working[self.first_day - index.first_day:self.first_day - index.first_day + span]
+            self.working[row, :chunk.size] = chunk
+            for day in index.unavailable[worker.identification]:
+                if 0 <= day - self.first_day < span:
+                    self.unavailable[row, day - self.first_day] = True
+        offsets = np.arange(span)
+        self.weekend_or_holiday = np.array([is_weekend_day(self.first_day + offset) or self.first_day + offset in run.holidays_set for offset in offsets], dtype=bool)
+
+        groups = sorted({worker.group for worker in workers} | {group for worker in workers for group in worker.group_incompatibility}, key=str)
+        self.group_codes = {group: code for code, group in enumerate(groups)}
+        self.incompatible = np.zeros((count, len(groups)), dtype=bool)
+        for row, worker in enumerate(workers):
+            for group in worker.group_incompatibility:
+                self.incompatible[row, self.group_codes[group]] = True
+        self.group_of_row = np.array([self.group_codes[worker.group] for worker in workers], dtype=np.int64)
+
+        self.rows = {worker.identification: row for row, worker in enumerate(workers)}
+        self.job_codes = {job: code for code, job in enumerate(run.jobs)}
+        self.percentage = np.array([worker.percentage_shifts for worker in workers], dtype=float)
+        self.adjusted_min_distance = run.min_distance * 100 / self.percentage
+        self.quota = np.array([worker.shift_quota for worker in workers], dtype=float)
+        # Copies of the run's tracker arrays, reordered from tracker rows to roster positions
+        tracker_rows = np.array([run.rows[worker.identification] for worker in workers], dtype=np.int64)
+        last_day = np.frombuffer(run.last_day, dtype=np.int64)[tracker_rows]
+        self.has_last = last_day != NO_SHIFT
+        self.last_day = np.where(self.has_last, last_day, 0)
+        self.recent = np.frombuffer(run.recent, dtype=np.int64).reshape(-1, run.week_slots)[tracker_rows]
+        self.recent_next = np.array(run.recent_next, dtype=np.int64)[tracker_rows]
+        self.recent_weekend = np.frombuffer(run.recent_weekend, dtype=np.int64).reshape(-1, WEEKEND_SHIFT_LIMIT)[tracker_rows]
+        self.recent_weekend_next = np.array(run.recent_weekend_next, dtype=np.int64)[tracker_rows]
+        self.fixed = self._padded(run.fixed, tracker_rows)
+        self.fixed_weekend = self._padded(run.fixed_weekend, tracker_rows)
+        self.job_count = np.array(run.job_count, dtype=np.int64).reshape(-1, len(run.jobs))[tracker_rows]
+        self.last_job = np.array(run.last_job, dtype=np.int64)[tracker_rows]
+        self.last_weekday = np.array(run.last_weekday, dtype=np.int64)[tracker_rows]
+        rotation = np.frombuffer(bytes(run.rotation), dtype=np.uint8)[tracker_rows]
+        self.rotation = (rotation[:, None] >> np.arange(7)) & 1 == 1
+
+    @staticmethod
+    def _padded(days_by_row, tracker_rows):
+        # Per-row lists of day ordinals as one matrix padded with NO_SHIFT
+        width = max((len(days) for days in days_by_row.values()), default=0)
+        padded = np.full((len(tracker_rows), width), NO_SHIFT, dtype=np.int64)
+        for position, row in enumerate(tracker_rows):
+            days = days_by_row.get(int(row), ())
+            padded[position, :len(days)] = days
+        return padded
+
+    @staticmethod
+    def _count_between(days, start, end):
+        return ((days >= start) & (days <= end)).sum(axis=1)
+
+    def feasible(self, day, job, override=False):
+        offset = day - self.first_day
+        checks = [(UNAVAILABLE, ~self.unavailable[:, offset])]
+        if not override:
+            assigned = list(self.run.occupancy.get(day, {}).values())
+            if assigned:
+                # Both ways: rows listing a group already placed, and rows of a group listed by someone placed
+                codes = [self.group_codes[group] for group in map(self.run.worker_groups.get, assigned) if group in self.group_codes]
+                listed = [self.group_codes[group] for worker_id in assigned for group in self.run.worker_incompatibility.get(worker_id, ())]
+                compatible = ~self.incompatible[:, codes].any(axis=1) & ~np.isin(self.group_of_row, listed)
+                # A worker already placed that day only clashes with others, as in group_conflict
+                for worker_id in assigned:
+                    row = self.rows.get(worker_id)
+                    if row is not None and not compatible[row]:
+                        others = [other for other in assigned if other != worker_id]
+                        compatible[row] = not group_conflict(self.run.workers[row], others, self.run.worker_groups, self.run.worker_incompatibility)
+                checks.insert(0, (GROUP_INCOMPATIBILITY, compatible))
+            days_diff = day - self.last_day
+            checks.append((OUTSIDE_WORK_PERIOD, self.working[:, offset]))
+            checks.append((MIN_DISTANCE, ~(self.has_last & (days_diff < self.adjusted_min_distance))))
+            checks.append((REST_PATTERN, ~(self.has_last & np.isin(days_diff, sorted(REST_PATTERN_DAYS)))))
+            if self.weekend_or_holiday[offset]:
+                window = (day - WEEKEND_WINDOW_DAYS + 1, day)
+                checks.append((WEEKEND_LIMIT, self._count_between(self.recent_weekend, *window) + self._count_between(self.fixed_weekend, *window) < WEEKEND_SHIFT_LIMIT))
+            week = (day - 1) // 7 * 7 + 1
+            checks.append((WEEKLY_LIMIT, self._count_between(self.recent, week, week + 6) + self._count_between(self.fixed, week, week + 6) < self.run.max_shifts_per_week))
+            checks.append((JOB_REPETITION, ~(self.has_last & (self.job_count[:, self.job_codes[job]] > 0) & (days_diff == 1))))
+
+        mask = self.quota > 0
+        stats = self.run.stats
+        for reason, passed in checks:
+            if stats is not None:
+                # Counted in the order can_work_on_date checks them, over every worker with quota left
+                stats.rejections[reason] += int(np.count_nonzero(mask & ~passed))
+            mask &= passed
+        return mask
+
+    def select(self, mask, day, job):
+        # Lexicographic argmax over the greedy selection key, first roster position on ties
+        if not mask.any():
+            return None
+        weekday = (day + 6) % 7
+        days_since = np.where(self.has_last, (day - self.last_day).astype(float), np.inf)
+        for column in (days_since, self.quota, self.percentage, self.last_job != self.job_codes[job], self.last_weekday != weekday, ~self.rotation[:, weekday]):
+            best = column[mask].max()
+            mask = mask & (column == best)
+        return int(np.flatnonzero(mask)[0])
+
+    def assign(self, row, day, job):
+        self.quota[row] -= 1
+        self.has_last[row] = True
+        self.last_day[row] = day
+        self.job_count[row, self.job_codes[job]] += 1
+        self.recent[row, self.recent_next[row]] = day
+        self.recent_next[row] = (self.recent_next[row] + 1) % self.recent.shape[1]
+        if self.weekend_or_holiday[day - self.first_day]:
+            self.recent_weekend[row, self.recent_weekend_next[row]] = day
+            self.recent_weekend_next[row] = (self.recent_weekend_next[row] + 1) % WEEKEND_SHIFT_LIMIT
+        self.last_job[row] = self.job_codes[job]
+        self.last_weekday[row] = (day + 6) % 7
+        self.rotation[row, (day + 6) % 7] = True
+
+def fill_vectorized(run):
+    matrix = FeasibilityMatrix(run)
+    for days_done, day in enumerate(run.days()):
+        run.checkpoint(days_done)
+        for job in run.jobs:
+            if job in run.occupancy[day]:
+                continue  # Skip if obligatory coverage shift exists
+            row = matrix.select(matrix.feasible(day, job), day, job)
+            if row is None:
+                row = matrix.select(matrix.feasible(day, job, override=True), day, job)
+                if row is None:
+                    logger.error("No available workers for job %s on %s. Stopping assignment.", job, format_day(day))
+                    return
+                if run.stats is not None:
+                    run.stats.override_fallbacks += 1
+            run.assign(run.workers[row], day, job)
+            matrix.assign(row, day, job)
@@ -1,6 +1,9 @@
 from datetime import datetime
 
 class Worker:
+    __slots__ = ('identification', 'work_dates', 'percentage_shifts', 'group', 'incompatible_job', 'group_incompatibility', 'obligatory_coverage',
+                 'obligatory_coverage_shifts', 'unavailable_dates', 'shift_quota', 'weekly_shift_quota', 'has_exception')
+
     def __init__(self, identification, work_dates=None, percentage=100.0, group='1', incompatible_job=None, group_incompatibility=None, obligatory_coverage=None, unavailable_dates=None):
         if work_dates:
             self.work_dates = [(datetime.strptime(start.strip(), "%d/%m/%Y"), datetime.strptime(end.strip(), "%d/%m/%Y")) for period in work_dates if '-' in period for start, end in [period.split('-')]]
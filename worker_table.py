@@ -0,0 +1,165 @@
+from array import array
+from datetime import datetime, date
+from shift_scheduler import to_day_ordinal
+
+def _days(values):
+    return array('l', sorted({to_day_ordinal(value) for value in values if not (isinstance(value, str) and not value.strip())}))
+
+def _periods(values):
+    # "start-end" strings or (start, end) pairs, flattened to start, end day ordinals
+    periods = array('l')
+    for value in values:
+        if isinstance(value, str):
+            if '-' not in value:
+                continue
+            value = value.split('-')
+        periods.extend((to_day_ordinal(value[0]), to_day_ordinal(value[1])))
+    return periods
+
+def _column(name):
+    return property(lambda self: getattr(self.table, name)[self.row], lambda self, value: getattr(self.table, name).__setitem__(self.row, value))
+
+class WorkerTable:
+    """Columnar roster for large worker counts: one integer row per worker.
+
+    Scalar attributes live in typed arrays, dates as per-row arrays of day ordinals and
+    groups as shared strings. Rows are handed out as WorkerView objects, which provide the
+    worker.Worker attributes and can be passed to schedule_shifts like Worker objects.
+    """
+
+    def __init__(self):
+        self.identification = []
+        self.rows = {}
+        self.percentage_shifts = array('d')
+        self.group = []
+        self.shift_quota = array('d')
+        self.weekly_shift_quota = array('d')
+        self.has_exception = bytearray()
+        self.work_periods = []
+        self.unavailable = []
+        self.obligatory = []
+        self.incompatible_job = []
+        self.group_incompatibility = []
+        self.obligatory_coverage_shifts = {}  # row -> {day: job}, created on first use
+        self._strings = {}
+
+    def _shared(self, values):
+        # Groups and incompatibility tuples repeat across workers, keep one copy of each
+        return self._strings.setdefault(values, values)
+
+    def add(self, identification, work_dates=None, percentage=100.0, group='1', incompatible_job=None, group_incompatibility=None, obligatory_coverage=None, unavailable_dates=None):
+        # Takes the worker.Worker constructor arguments and returns the new row's view
+        row = len(self.identification)
+        self.identification.append(identification)
+        self.rows[identification] = row
+        self.percentage_shifts.append(float(percentage) if percentage else 100.0)
+        self.group.append(self._shared(group if group else '1'))
+        self.shift_quota.append(0.0)
+        self.weekly_shift_quota.append(0.0)
+        self.has_exception.append(0)
+        self.work_periods.append(_periods(work_dates or ()))
+        self.unavailable.append(_days(unavailable_dates or ()))
+        self.obligatory.append(array('l', [to_day_ordinal(value) for value in obligatory_coverage or () if not (isinstance(value, str) and not value.strip())]))
+        self.incompatible_job.append(self._shared(tuple(incompatible_job or ())))
+        self.group_incompatibility.append(self._shared(tuple(group_incompatibility or ())))
+        return WorkerView(self, row)
+
+    @classmethod
+    def from_workers(cls, workers):
+        table = cls()
+        for worker in workers:
+            table.add(worker.identification, worker.work_dates, worker.percentage_shifts, worker.group, worker.incompatible_job, worker.group_incompatibility, worker.obligatory_coverage, worker.unavailable_dates)
+        return table
+
+    def __len__(self):
+        return len(self.identification)
+
+    def __getitem__(self, row):
+        if not 0 <= row < len(self.identification):
+            raise IndexError(row)
+        return WorkerView(self, row)
+
+    def __iter__(self):
+        return (WorkerView(self, row) for row in range(len(self.identification)))
+
+    def view(self, identification):
+        return WorkerView(self, self.rows[identification])
+
+class WorkerView:
+    """The worker.Worker attributes of one WorkerTable row, read from and written to its columns."""
+    __slots__ = ('table', 'row')
+
+    def __init__(self, table, row):
+        self.table = table
+        self.row = row
+
+    identification = property(lambda self: self.table.identification[self.row])
+    percentage_shifts = _column('percentage_shifts')
+    group = _column('group')
+    shift_quota = _column('shift_quota')
+    weekly_shift_quota = _column('weekly_shift_quota')
+
+    @property
+    def has_exception(self):
+        return bool(self.table.has_exception[self.row])
+
+    @has_exception.setter
+    def has_exception(self, value):
+        self.table.has_exception[self.row] = bool(value)
+
+    @property
+    def work_dates(self):
+        periods = self.table.work_periods[self.row]
+        return [(datetime.fromordinal(periods[i]), datetime.fromordinal(periods[i + 1])) for i in range(0, len(periods), 2)]
+
+    @work_dates.setter
+    def work_dates(self, value):
+        self.table.work_periods[self.row] = _periods(value or ())
+
+    @property
+    def unavailable_dates(self):
+        return [date.fromordinal(day) for day in self.table.unavailable[self.row]]
+
+    @unavailable_dates.setter
+    def unavailable_dates(self, value):
+        self.table.unavailable[self.row] = _days(value or ())
+
+    @property
+    def obligatory_coverage(self):
+        return [date.fromordinal(day) for day in self.table.obligatory[self.row]]
+
+    @obligatory_coverage.setter
+    def obligatory_coverage(self, value):
+        self.table.obligatory[self.row] = array('l', [to_day_ordinal(day) for day in value or () if not (isinstance(day, str) and not day.strip())])
+
+    @property
+    def incompatible_job(self):
+        return self.table.incompatible_job[self.row]
+
+    @incompatible_job.setter
+    def incompatible_job(self, value):
+        self.table.incompatible_job[self.row] = self.table._shared(tuple(value or ()))
+
+    @property
+    def group_incompatibility(self):
+        return self.table.group_incompatibility[self.row]
+
+    @group_incompatibility.setter
+    def group_incompatibility(self, value):
+        self.table.group_incompatibility[self.row] = self.table._shared(tuple(value or ()))
+
+    @property
+    def obligatory_coverage_shifts(self):
+        return self.table.obligatory_coverage_shifts.setdefault(self.row, {})
+
+    def __repr__(self):
+        return f"WorkerView({self.identification!r})"
+
+    def __lt__(self, other):
+        return (self.shift_quota, self.identification) < (other.shift_quota, other.identification)
+
+    def __le__(self, other):
+        return (self.shift_quota, self.identification) <= (other.shift_quota, other.identification)
+
+    def __eq__(self, other):
+        return (self.shift_quota, self.identification) == (other.shift_quota, other.identification)